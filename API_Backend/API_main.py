@@ -1,23 +1,83 @@
-from fastapi import FastAPI, File, UploadFile, Form
-from fastapi.responses import JSONResponse
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Union
+from fastapi import FastAPI, Form, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+import json
 import os
 
 from backend.utiils import (
-    save_file_bytes,
-    list_collections,
+    UploadWriter,
+    UploadTooLarge,
+    clean_filename,
+    MAX_UPLOAD_BYTES,
     collection_path,
     vectorstore_dir_for,
-    load_chat_history,
+    load_chat_page,
+    load_chat_since,
+    chat_signature,
     save_chat_history,
     append_to_chat,
+    append_many_to_chat,
+    render_chat_markdown,
     delete_collection,
 )
-from backend.RAG_end import create_vectorstore, load_vectorstore_if_exists, get_conversational_chain, embeddings
-from backend.SQL_end import load_csv_to_sql, get_table_info, generate_sql, run_query
-from backend.loaders import load_docs_by_ext
+from backend.RAG_end import (
+    index_documents,
+    get_cached_chain,
+    invalidate_collection,
+    stream_answer,
+    chat_history_for,
+    answer_question,
+    answer_cache,
+    parse_scope,
+    is_indexed,
+    collection_version,
+    scope_version,
+    delete_from_shared_index,
+    embed_queries,
+    retrieve_by_vector,
+    answer_from_docs,
+    INDEX_MODE,
+    ALL_COLLECTIONS,
+    collection_cache,
+)
+from backend.SQL_end import (
+    ingest_csv,
+    invalidate_db_caches,
+    get_cached_table_info,
+    question_to_sql,
+    schema_cache,
+    sql_cache,
+)
+from backend.loaders import iter_docs_by_ext
+from backend.catalog import catalog, csv_db_path_for, STATUSES
+from backend.jobs import JobManager
+from backend import models
+from backend import metrics
+from backend.metrics import stage
+from backend.query_engine import execute_query, fetch_page
 
 app = FastAPI(title="File-RAG / CSV-SQL API")
+ingest_jobs = JobManager()
+
+# /ask_batch: LLM calls in flight per request, and questions accepted per request.
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "8"))
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "500"))
+# GET /collections: default and maximum page size.
+COLLECTIONS_PAGE_SIZE = int(os.getenv("COLLECTIONS_PAGE_SIZE", "100"))
+MAX_COLLECTIONS_PAGE_SIZE = 1000
+# Room for the multipart framing and small form fields on top of MAX_UPLOAD_BYTES.
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# GET /chat/{name}: largest `limit` accepted.
+MAX_CHAT_PAGE_SIZE = 1000
 
 origins = [
     "http://localhost",
@@ -32,6 +92,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.on_event("startup")
+def warm_models():
+    # Models load on first use anyway; this just gets it out of the first request's way.
+    if os.getenv("MODEL_WARMUP", "1") == "1":
+        models.warmup(background=True)
 
 
 @app.get("/")
@@ -39,73 +108,348 @@ def read_root():
     return {"status": "API is running"}
 
 
-@app.post("/upload")
-def upload_file(file: UploadFile = File(...), file_type: str = Form(...)):
-    try:
-        content = file.file.read()
-        saved_name = save_file_bytes(file.filename, content)
-        display_name = file.filename
+@app.get("/ready")
+def readiness():
+    """200 once the embedding model and LLM are loaded, 503 until then."""
+    st = models.status()
+    return JSONResponse(status_code=200 if st["ready"] else 503, content=st)
+
+
+def _record_csv(saved_name: str, db_path: str, stats: dict):
+    catalog.update(saved_name, status="ready", error=None, db_path=db_path, table_name=stats["table_name"],
+                   rows=stats["rows"], ingest_seconds=stats["seconds"], backfilled=0,
+                   index_version=f"{os.stat(db_path).st_mtime_ns:x}")
 
-        ext = file_type.lower()
-        response = {"saved_name": saved_name, "filename": file.filename, "ext": ext}
 
-        full_path = collection_path(saved_name)
+def _record_rag(saved_name: str, vect_dir: str, stats: dict):
+    catalog.update(saved_name, status="ready", error=None, vect_dir=vect_dir, index_mode=INDEX_MODE,
+                   pages=stats["pages"], chunks=stats["chunks"], ingest_seconds=stats["seconds"], backfilled=0,
+                   index_version=collection_version(vect_dir))
 
+
+def _ingest_upload(job, saved_name: str, ext: str):
+    full_path = collection_path(saved_name)
+    result = {"saved_name": saved_name, "ext": ext}
+    catalog.update(saved_name, status="indexing", error=None)
+
+    try:
         if ext == "csv":
-            db_dir = os.path.join("data", "csv_dbs")
-            os.makedirs(db_dir, exist_ok=True)
-            db_path = os.path.join(db_dir, f"{saved_name}.db")
-            db_path, table_name = load_csv_to_sql(full_path, db_path=db_path)
-            schema = get_table_info(db_path)
-            response.update({"mode": "csv", "db_path": db_path, "table_name": table_name, "schema": schema})
-            return JSONResponse(status_code=200, content=response)
+            db_path = csv_db_path_for(saved_name)
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            job.update(stage="loading")
+            stats = ingest_csv(full_path, db_path=db_path)
+            schema = get_cached_table_info(db_path)
+            job.update(rows_loaded=stats["rows"])
+            _record_csv(saved_name, db_path, stats)
+            result.update({"mode": "csv", "db_path": db_path, "table_name": stats["table_name"],
+                           "schema": schema, "ingest": stats})
         else:
-            docs = load_docs_by_ext(ext, full_path)
+            job.update(stage="loading")
+            docs = iter_docs_by_ext(ext, full_path)
             vect_dir = vectorstore_dir_for(saved_name)
-            create_vectorstore(docs, persist_directory=vect_dir)
-            response.update({"mode": "rag", "vect_dir": vect_dir})
-            return JSONResponse(status_code=200, content=response)
+            _, stats = index_documents(docs, persist_directory=vect_dir, progress=job.update,
+                                       saved_name=saved_name, ext=ext)
+            invalidate_collection(saved_name)
+            _record_rag(saved_name, vect_dir, stats)
+            result.update({"mode": "rag", "vect_dir": vect_dir, "ingest": stats})
+    except Exception as e:
+        catalog.update(saved_name, status="failed", error=str(e))
+        raise
+    return result
+
+
+def _still_indexing(saved_name: str):
+    return JSONResponse(status_code=409, content={"error": f"'{saved_name}' is still being indexed"})
+
+
+def _unknown(saved_name: str):
+    return JSONResponse(status_code=404, content={"error": f"Unknown collection '{saved_name}'"})
+
+
+class _UploadForm:
+    """
+    python-multipart callbacks for /upload: the small form fields are kept in
+    memory, the file part's bytes are queued in `pending` for an UploadWriter.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.filename = None
+        self.writer = None
+        self.pending = []
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name = None
+        self._is_file = False
+        self._value = []
+        self._value_size = 0
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._value = []
+        self._value_size = 0
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = params.get(b"name", b"").decode("utf-8")
+        filename = params.get(b"filename")
+        self._is_file = filename is not None
+        if self._is_file:
+            if self.writer is not None:
+                raise ValueError("Only one file can be uploaded per request")
+            self.filename = filename.decode("utf-8")
+            self.writer = UploadWriter(MAX_UPLOAD_BYTES)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._is_file:
+            self.pending.append(data[start:end])
+            return
+        self._value_size += end - start
+        if self._value_size > UPLOAD_FORM_OVERHEAD:
+            raise ValueError(f"Form field '{self._name}' is too large")
+        self._value.append(data[start:end])
+
+    def on_part_end(self):
+        if not self._is_file and self._name:
+            self.fields[self._name] = b"".join(self._value).decode("utf-8")
+
+
+async def _receive_upload(request: Request) -> _UploadForm:
+    """
+    Parse the multipart body as it arrives and write the file part straight
+    into UPLOAD_DIR (no spooled temp copy). Stops reading, and drops the
+    partial file, as soon as the file exceeds MAX_UPLOAD_BYTES.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data body")
+    form = _UploadForm()
+    parser = MultipartParser(params[b"boundary"], form.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if form.pending:
+                data = b"".join(form.pending)
+                form.pending.clear()
+                await run_in_threadpool(form.writer.write, data)
+        parser.finalize()
+    except BaseException:
+        if form.writer is not None:
+            form.writer.discard()
+        raise
+    return form
+
+
+def _queue_upload(writer: UploadWriter, filename: str, ext: str, replace: bool):
+    if replace and ingest_jobs.is_pending(clean_filename(filename)):
+        # Replacing would overwrite the file under a running ingestion.
+        writer.discard()
+        return _still_indexing(clean_filename(filename))
+    try:
+        saved_name, sha256, size = writer.claim(filename, replace)
+        catalog.register(saved_name, ext, status="queued", source_sha256=sha256, size=size)
+        job = ingest_jobs.submit(saved_name, "upload", lambda job: _ingest_upload(job, saved_name, ext),
+                                 on_cancel=lambda: catalog.update(saved_name, status="uploaded"))
+        response = {"saved_name": saved_name, "filename": filename, "ext": ext,
+                    "sha256": sha256, "size": size, "job_id": job.id, "stage": job.stage}
+        return JSONResponse(status_code=202, content=response)
     except Exception as e:
+        writer.discard()
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+_UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file", "file_type"],
+            "properties": {
+                "file": {"type": "string", "format": "binary"},
+                "file_type": {"type": "string"},
+                "replace": {"type": "boolean", "default": False},
+            },
+        }}},
+    }
+}
+
+
+@app.post("/upload", openapi_extra=_UPLOAD_FORM_SCHEMA)
+async def upload_file(request: Request):
+    """
+    Multipart form with `file`, `file_type` and optional `replace`.
+    Save the file and queue its ingestion. Returns 202 with a job id;
+    poll GET /jobs/{job_id} until the stage is `done`.
+    Oversized uploads get 413 from the Content-Length header before any of
+    the body is read, or as soon as the streamed file passes the limit.
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD:
+        return JSONResponse(status_code=413, content={"error": f"Upload exceeds the limit of {MAX_UPLOAD_BYTES} bytes"})
+    try:
+        with stage("save_upload"):
+            form = await _receive_upload(request)
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    except (ValueError, FormParserError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    if form.writer is None or not form.fields.get("file_type"):
+        if form.writer is not None:
+            form.writer.discard()
+        return JSONResponse(status_code=422, content={"error": "`file` and `file_type` are required"})
+    replace = form.fields.get("replace", "").strip().lower() in ("1", "true", "yes", "on")
+    return await run_in_threadpool(_queue_upload, form.writer, form.filename,
+                                   form.fields["file_type"].lower(), replace)
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+    if not ingest_jobs.cancel(job_id):
+        return JSONResponse(status_code=409, content={"error": f"Job is {job.stage}, only queued jobs can be cancelled"})
+    return job.to_dict()
+
+
+def _validators(etag: str, last_modified: float):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def _not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """If-None-Match wins over If-Modified-Since, as in RFC 9110."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = [t.strip() for t in inm.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@app.post("/collections/{saved_name}/refresh")
+def refresh_collection(saved_name: str):
+    """
+    Queue re-ingestion of a saved collection. URL collections are re-crawled
+    with conditional requests, so only new or changed pages are embedded.
+    """
+    entry = catalog.get(saved_name)
+    if entry is None:
+        return _unknown(saved_name)
+    if ingest_jobs.is_pending(saved_name):
+        return _still_indexing(saved_name)
+    ext = entry["ext"]
+    previous = entry["status"] if entry["status"] in ("ready", "failed") else "uploaded"
+    catalog.update(saved_name, status="queued")
+    # A cancelled refresh leaves the collection as it was, index included.
+    job = ingest_jobs.submit(saved_name, "refresh", lambda job: _ingest_upload(job, saved_name, ext),
+                             on_cancel=lambda: catalog.update(saved_name, status=previous))
+    return JSONResponse(status_code=202, content={"saved_name": saved_name, "job_id": job.id, "stage": job.stage})
+
+
 @app.get("/collections")
-def api_list_collections():
+def api_list_collections(request: Request, offset: int = 0, limit: int = COLLECTIONS_PAGE_SIZE,
+                         mode: Optional[str] = None, status: Optional[str] = None, q: Optional[str] = None):
+    """
+    One page of the collection catalog, filterable by `mode` (rag/csv),
+    `status` and a name substring `q`. `collections` lists the page's names,
+    `items` their catalog records. Honors If-None-Match / If-Modified-Since with 304.
+    """
+    if mode not in (None, "rag", "csv"):
+        return JSONResponse(status_code=400, content={"error": "mode must be 'rag' or 'csv'"})
+    if status is not None and status not in STATUSES:
+        return JSONResponse(status_code=400, content={"error": f"status must be one of {', '.join(STATUSES)}"})
+    offset = max(offset, 0)
+    limit = min(max(limit, 1), MAX_COLLECTIONS_PAGE_SIZE)
     try:
-        cols = list_collections()
-        return {"collections": cols}
+        etag, last_modified = catalog.signature()
+        headers = _validators(etag, last_modified)
+        if _not_modified(request, etag, last_modified):
+            return Response(status_code=304, headers=headers)
+        items, total = catalog.list(offset=offset, limit=limit, mode=mode, status=status, q=q)
+        next_offset = offset + len(items) if offset + len(items) < total else None
+        return JSONResponse(content={"collections": [i["saved_name"] for i in items], "items": items,
+                                     "total": total, "offset": offset, "limit": limit,
+                                     "next_offset": next_offset}, headers=headers)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
 @app.post("/activate")
 def activate_collection(saved_name: str = Form(...)):
+    if ingest_jobs.is_pending(saved_name):
+        return _still_indexing(saved_name)
+    entry = catalog.get(saved_name)
+    if entry is None:
+        return _unknown(saved_name)
     try:
-        ext = saved_name.split(".")[-1].lower()
-        full_path = collection_path(saved_name)
-        if ext == "csv":
-            db_dir = os.path.join("data", "csv_dbs")
-            os.makedirs(db_dir, exist_ok=True)
-            db_path = os.path.join(db_dir, f"{saved_name}.db")
-            if not os.path.exists(db_path):
-                db_path, table_name = load_csv_to_sql(full_path, db_path=db_path)
-            schema = get_table_info(db_path)
-            return {"mode": "csv", "db_path": db_path, "schema": schema, "table_name": os.path.splitext(os.path.basename(full_path))[0]}
+        if entry["mode"] == "csv":
+            db_path = _csv_db_path(saved_name)
+            schema = get_cached_table_info(db_path)
+            table_name = catalog.get(saved_name)["table_name"] or os.path.splitext(saved_name)[0]
+            return {"mode": "csv", "db_path": db_path, "schema": schema, "table_name": table_name}
         else:
-            ext = ext
-            vect_dir = vectorstore_dir_for(saved_name)
-            if not os.path.exists(vect_dir):
-                docs = load_docs_by_ext(ext, full_path)
-                create_vectorstore(docs, persist_directory=vect_dir)
-            return {"mode": "rag", "vect_dir": vect_dir}
+            entry = _ensure_indexed(saved_name)
+            return {"mode": "rag", "vect_dir": entry["vect_dir"]}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
 @app.delete("/collections/{saved_name}")
 def api_delete_collection(saved_name: str):
+    """
+    Delete a collection, all or nothing (see `delete_collection`). Its chunks
+    leave the shared index only once the catalog row is gone.
+    """
+    if ingest_jobs.is_pending(saved_name):
+        return _still_indexing(saved_name)
+    entry = catalog.get(saved_name)
     try:
+        if entry is not None and entry["mode"] == "csv":
+            invalidate_db_caches(entry["db_path"])
+        invalidate_collection(saved_name)
+        answer_cache.drop(saved_name)
         ok = delete_collection(saved_name)
+        if ok:
+            delete_from_shared_index(saved_name)
         return {"deleted": ok}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -120,55 +464,413 @@ def api_clear_chat(saved_name: str = Form(...)):
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+def _describe_page(page) -> str:
+    rows = page["rows"]
+    if len(page["columns"]) == 1 and len(rows) == 1 and not page["has_more"]:
+        return f"The answer is **{next(iter(rows[0].values()))}**."
+    if page["has_more"]:
+        return f"Showing the first {len(rows)} rows; more are available."
+    return f"Returned {len(rows)} rows."
+
+
+def _catalog_entry(saved_name: str):
+    entry = catalog.get(saved_name)
+    if entry is None:
+        raise ValueError(f"Unknown collection '{saved_name}'")
+    return entry
+
+
+def _ensure_indexed(saved_name: str):
+    """
+    Catalog entry of a document collection, indexing it first unless the
+    catalog already records it as ready for the current INDEX_MODE.
+    """
+    entry = _catalog_entry(saved_name)
+    if entry["mode"] == "csv":
+        raise ValueError(f"'{saved_name}' is a CSV collection and can't be searched as documents")
+    if entry["status"] == "ready" and entry["index_mode"] == INDEX_MODE:
+        return entry
+    vect_dir = entry["vect_dir"] or vectorstore_dir_for(saved_name)
+    if entry["backfilled"] and entry["status"] not in ("failed", "queued", "indexing") and is_indexed(vect_dir):
+        # Imported from before the catalog: built on disk, just not recorded yet.
+        catalog.update(saved_name, status="ready", error=None, vect_dir=vect_dir, index_mode=INDEX_MODE,
+                       index_version=collection_version(vect_dir), backfilled=0)
+    else:
+        docs = iter_docs_by_ext(entry["ext"], collection_path(saved_name))
+        _, stats = index_documents(docs, persist_directory=vect_dir, saved_name=saved_name, ext=entry["ext"])
+        invalidate_collection(saved_name)
+        _record_rag(saved_name, vect_dir, stats)
+    return catalog.get(saved_name)
+
+
+def _csv_db_path(saved_name: str) -> str:
+    """SQLite path of a CSV collection, loading the CSV first unless the catalog has it ready."""
+    entry = _catalog_entry(saved_name)
+    if entry["status"] == "ready" and entry["db_path"]:
+        return entry["db_path"]
+    db_path = entry["db_path"] or csv_db_path_for(saved_name)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    stats = ingest_csv(collection_path(saved_name), db_path=db_path)
+    _record_csv(saved_name, db_path, stats)
+    return db_path
+
+
+def _rag_chain(saved_name: str):
+    """
+    Cached chain for a document collection, indexing it first if needed.
+    `saved_name` may also be "a.pdf,b.pdf" or "*" when INDEX_MODE=shared.
+    Returns (chain, version).
+    """
+    names = parse_scope(saved_name)
+    if (names is None or len(names) > 1) and INDEX_MODE != "shared":
+        raise ValueError("Asking across several collections needs INDEX_MODE=shared")
+    for name in names or []:
+        _ensure_indexed(name)
+    with stage("open_collection"):
+        chain = get_cached_chain(saved_name, vectorstore_dir_for(saved_name))
+    return chain, scope_version(saved_name)
+
+
+def _is_csv(saved_name: str) -> bool:
+    if "," in saved_name or saved_name == ALL_COLLECTIONS:
+        return False
+    entry = catalog.get(saved_name)
+    return entry is not None and entry["mode"] == "csv"
+
+
+def _unknown_in_scope(saved_name: str):
+    """The first collection named by `saved_name` that the catalog does not know, if any."""
+    names = parse_scope(saved_name)
+    if names is not None and not names:
+        return saved_name
+    return next((n for n in names or [] if catalog.get(n) is None), None)
+
+
+def _pending(saved_name: str) -> bool:
+    return any(ingest_jobs.is_pending(n) for n in parse_scope(saved_name) or [])
+
+
+def _cached_answer(saved_name: str, version: str, question: str, history):
+    """
+    answer_cache lookup for a RAG question. The cache is keyed by the question
+    alone, so with chat history (a possible follow-up) it is skipped.
+    """
+    if history:
+        return None, "skip", None
+    with stage("answer_cache"):
+        return answer_cache.get(saved_name, version, question)
+
+
 @app.post("/ask")
 def ask(saved_name: str = Form(...), question: str = Form(...)):
+    """
+    `saved_name` is one collection, or with INDEX_MODE=shared a comma-separated
+    list of document collections or "*" for all of them (one filtered search).
+    """
+    missing = _unknown_in_scope(saved_name)
+    if missing is not None:
+        return _unknown(missing)
+    if _pending(saved_name):
+        return _still_indexing(saved_name)
     try:
-        ext = saved_name.split(".")[-1].lower()
-        full_path = collection_path(saved_name)
-
-        if ext == "csv":
-            db_dir = os.path.join("data", "csv_dbs")
-            db_path = os.path.join(db_dir, f"{saved_name}.db")
-            if not os.path.exists(db_path):
-                db_path, _ = load_csv_to_sql(full_path, db_path=db_path)
-            schema = get_table_info(db_path)
-            sql_query = generate_sql(question, schema)
-            res = run_query(sql_query, db_path)
+        if _is_csv(saved_name):
+            db_path = _csv_db_path(saved_name)
+            sql_query, schema, cache_hit = question_to_sql(question, db_path)
             append_to_chat(saved_name, "user", question)
-            if isinstance(res, str):
-                assistant = f"❌ SQL Error: {res}"
-                append_to_chat(saved_name, "assistant", assistant)
-                return {"mode": "csv", "sql": sql_query, "result": [], "assistant": assistant}
-            else:
-                if len(res.columns) == 1 and len(res) == 1:
-                    val = res.iloc[0, 0]
-                    assistant = f"The answer is **{val}**."
-                else:
-                    assistant = f"Returned {len(res)} rows. (Showing top 10)"
+            try:
+                page = execute_query(sql_query, db_path)
+            except Exception as e:
+                sql_cache.forget(db_path, schema, question)
+                assistant = f"❌ SQL Error: {e}"
                 append_to_chat(saved_name, "assistant", assistant)
-                return {"mode": "csv", "sql": sql_query, "result": res.head(10).to_dict(orient="records"), "assistant": assistant}
+                return {"mode": "csv", "sql": sql_query, "sql_cache": "hit" if cache_hit else "miss",
+                        "result": [], "assistant": assistant}
+            assistant = _describe_page(page)
+            append_to_chat(saved_name, "assistant", assistant)
+            return {"mode": "csv", "sql": sql_query, "sql_cache": "hit" if cache_hit else "miss",
+                    "result": page["rows"], "cursor": page["cursor"], "assistant": assistant}
 
         else:
-            vect_dir = vectorstore_dir_for(saved_name)
-            vect = load_vectorstore_if_exists(vect_dir)
-            if vect is None:
-                ext = saved_name.split(".")[-1].lower()
-                docs = load_docs_by_ext(ext, full_path)
-                vect = create_vectorstore(docs, persist_directory=vect_dir)
-            chain = get_conversational_chain(vect)
-            resp = chain({"question": question})
-            answer = resp.get("answer") if isinstance(resp, dict) else str(resp)
+            chain, version = _rag_chain(saved_name)
+            history = chat_history_for(saved_name)
+            answer, how, qvec = _cached_answer(saved_name, version, question, history)
+            if answer is None:
+                answer = answer_question(chain, question, history, callbacks=metrics.chain_callbacks())
+                if not history:
+                    answer_cache.put(saved_name, version, question, answer, qvec)
             append_to_chat(saved_name, "user", question)
             append_to_chat(saved_name, "assistant", answer)
-            return {"mode": "rag", "answer": answer}
+            return {"mode": "rag", "answer": answer, "answer_cache": how}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _stream_csv_answer(saved_name: str, question: str):
+    db_path = _csv_db_path(saved_name)
+    sql_query, schema, cache_hit = question_to_sql(question, db_path)
+    yield _sse("sql", {"sql": sql_query, "sql_cache": "hit" if cache_hit else "miss"})
+
+    try:
+        page = execute_query(sql_query, db_path)
+    except Exception as e:
+        sql_cache.forget(db_path, schema, question)
+        page = None
+        assistant = f"❌ SQL Error: {e}"
+    if page is not None:
+        for row in page["rows"]:
+            yield _sse("row", row)
+        assistant = _describe_page(page)
+    append_to_chat(saved_name, "user", question)
+    append_to_chat(saved_name, "assistant", assistant)
+    yield _sse("done", {"mode": "csv", "sql": sql_query, "assistant": assistant,
+                        "cursor": page["cursor"] if page is not None else None})
+
+
+def _stream_rag_answer(saved_name: str, question: str):
+    chain, version = _rag_chain(saved_name)
+    history = chat_history_for(saved_name)
+    answer, how, qvec = _cached_answer(saved_name, version, question, history)
+    if answer is not None:
+        yield _sse("token", {"text": answer})
+    else:
+        parts = []
+        for token in stream_answer(chain, question, history):
+            parts.append(token)
+            yield _sse("token", {"text": token})
+        answer = "".join(parts)
+        if not history:
+            answer_cache.put(saved_name, version, question, answer, qvec)
+    append_to_chat(saved_name, "user", question)
+    append_to_chat(saved_name, "assistant", answer)
+    yield _sse("done", {"mode": "rag", "answer": answer, "answer_cache": how})
+
+
+@app.post("/ask/stream")
+def ask_stream(saved_name: str = Form(...), question: str = Form(...)):
+    """
+    Server-Sent Events version of /ask.
+    RAG: `token` events, then `done` with the full answer.
+    CSV: `sql` first, then one `row` event per result row, then `done`.
+    Failures after the stream started arrive as an `error` event.
+    """
+    missing = _unknown_in_scope(saved_name)
+    if missing is not None:
+        return _unknown(missing)
+    if _pending(saved_name):
+        return _still_indexing(saved_name)
+    if _is_csv(saved_name):
+        events = _stream_csv_answer(saved_name, question)
+    else:
+        events = _stream_rag_answer(saved_name, question)
+
+    def guarded():
+        try:
+            yield from events
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+
+    return StreamingResponse(guarded(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class BatchQuestion(BaseModel):
+    question: str
+    saved_name: Optional[str] = None
+
+
+class AskBatchRequest(BaseModel):
+    questions: List[Union[str, BatchQuestion]]
+    saved_name: Optional[str] = None
+    persist_chat: bool = True
+    max_concurrency: Optional[int] = None
+
+
+def _batch_csv(saved_name: str, question: str, db_path: str):
+    timings = {}
+    t0 = time.perf_counter()
+    sql_query, schema, cache_hit = question_to_sql(question, db_path)
+    timings["sql_generate"] = time.perf_counter() - t0
+    out = {"mode": "csv", "sql": sql_query, "sql_cache": "hit" if cache_hit else "miss"}
+    t0 = time.perf_counter()
+    try:
+        page = execute_query(sql_query, db_path)
+    except Exception as e:
+        sql_cache.forget(db_path, schema, question)
+        out.update({"result": [], "assistant": f"❌ SQL Error: {e}"})
+    else:
+        out.update({"result": page["rows"], "cursor": page["cursor"], "assistant": _describe_page(page)})
+    timings["sql_execute"] = time.perf_counter() - t0
+    return out, timings
+
+
+def _batch_rag(saved_name: str, question: str, chain, version: str, vector):
+    timings = {}
+    answer, how, qvec = answer_cache.get(saved_name, version, question, vector=vector)
+    if answer is None:
+        t0 = time.perf_counter()
+        docs = retrieve_by_vector(chain.retriever, vector)
+        timings["retrieve"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        answer = answer_from_docs(question, docs)
+        timings["llm"] = time.perf_counter() - t0
+        answer_cache.put(saved_name, version, question, answer, qvec)
+    return {"mode": "rag", "answer": answer, "answer_cache": how}, timings
+
+
+@app.post("/ask_batch")
+def ask_batch(req: AskBatchRequest):
+    """
+    Answer many questions in one call. Each question is a string (asked against
+    the top-level `saved_name`) or {"question", "saved_name"}. Document questions
+    are embedded in one batch and answered independently of the chat memory;
+    LLM calls run concurrently, up to `max_concurrency` (capped by
+    ASK_BATCH_CONCURRENCY). With `persist_chat=false` nothing is written to the
+    chat history. Results come back in request order with per-question timings.
+    An unknown collection fails the whole batch with a 404.
+    """
+    if not req.questions:
+        return JSONResponse(status_code=400, content={"error": "No questions given"})
+    if len(req.questions) > ASK_BATCH_MAX_QUESTIONS:
+        return JSONResponse(status_code=413, content={"error": f"At most {ASK_BATCH_MAX_QUESTIONS} questions per batch"})
+    started = time.perf_counter()
+
+    items = []
+    for q in req.questions:
+        if isinstance(q, str):
+            items.append((req.saved_name, q))
+        else:
+            items.append((q.saved_name or req.saved_name, q.question))
+    results = [None] * len(items)
+    names = {name for name, _ in items if name}
+    for name in sorted(names):
+        missing = _unknown_in_scope(name)
+        if missing is not None:
+            return _unknown(missing)
+
+    # Open every collection once; a failure only fails that collection's questions.
+    targets = {}
+    for name in names:
+        try:
+            if _pending(name):
+                raise ValueError(f"'{name}' is still being indexed")
+            targets[name] = ("csv", _csv_db_path(name)) if _is_csv(name) else ("rag",) + _rag_chain(name)
+        except Exception as e:
+            targets[name] = ("error", str(e))
+
+    rag = [i for i, (name, _) in enumerate(items) if name and targets[name][0] == "rag"]
+    embed_started = time.perf_counter()
+    vectors = dict(zip(rag, embed_queries([items[i][1] for i in rag]))) if rag else {}
+    embed_seconds = time.perf_counter() - embed_started
+
+    def run(i):
+        name, question = items[i]
+        t0 = time.perf_counter()
+        out = {"index": i, "saved_name": name, "question": question}
+        try:
+            if not name:
+                raise ValueError("No saved_name for this question")
+            target = targets[name]
+            if target[0] == "error":
+                raise ValueError(target[1])
+            if target[0] == "csv":
+                answer, timings = _batch_csv(name, question, target[1])
+            else:
+                answer, timings = _batch_rag(name, question, target[1], target[2], vectors[i])
+            out.update(answer)
+            out["timings"] = {k: round(v, 4) for k, v in timings.items()}
+        except Exception as e:
+            out["error"] = str(e)
+        out["seconds"] = round(time.perf_counter() - t0, 4)
+        results[i] = out
+
+    concurrency = max(1, min(req.max_concurrency or ASK_BATCH_CONCURRENCY, ASK_BATCH_CONCURRENCY))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ask-batch") as pool:
+        # Copy the request context so stage timings land in this request's Server-Timing.
+        for f in [pool.submit(contextvars.copy_context().run, run, i) for i in range(len(items))]:
+            f.result()
+
+    if req.persist_chat:
+        chats = {}
+        for r in results:
+            if "error" not in r:
+                reply = r["answer"] if r["mode"] == "rag" else r["assistant"]
+                chats.setdefault(r["saved_name"], []).extend([("user", r["question"]), ("assistant", reply)])
+        for name, messages in chats.items():
+            append_many_to_chat(name, messages)
+
+    return {
+        "count": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "concurrency": concurrency,
+        "embed_seconds": round(embed_seconds, 4),
+        "seconds": round(time.perf_counter() - started, 4),
+        "results": results,
+    }
+
+
+@app.get("/query/page")
+def api_query_page(cursor: str):
+    """Next page of a CSV query result, using the `cursor` from /ask."""
+    try:
+        page = fetch_page(cursor)
+        if page is None:
+            return JSONResponse(status_code=404, content={"error": "Cursor expired or unknown"})
+        return page
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/cache/stats")
+def api_cache_stats():
+    return {
+        "collections": collection_cache.stats(),
+        "schemas": schema_cache.stats(),
+        "sql": sql_cache.stats(),
+        "answers": answer_cache.stats(),
+    }
+
+
+@app.get("/metrics")
+def api_metrics():
+    """Prometheus text format: per-stage and per-route latency histograms."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/chat/{saved_name}")
-def get_chat(saved_name: str):
+def get_chat(request: Request, saved_name: str,
+             limit: Optional[int] = Query(None, ge=1, le=MAX_CHAT_PAGE_SIZE),
+             before: Optional[int] = Query(None, ge=0),
+             since: Optional[int] = Query(None, ge=0)):
+    """
+    Chat messages, newest `limit` before `before`, or with `since=<id>` only
+    the messages after that id (oldest first). `last_id` is the cursor for the
+    next `since` call and `total` the full message count, so clients can tell
+    the chat was cleared. Honors If-None-Match / If-Modified-Since with 304.
+    """
+    try:
+        etag, last_modified, total, last_id = chat_signature(saved_name)
+        headers = _validators(etag, last_modified)
+        if _not_modified(request, etag, last_modified):
+            return Response(status_code=304, headers=headers)
+        next_before = None
+        if since is not None:
+            messages = load_chat_since(saved_name, since, limit=limit)
+            last_id = messages[-1]["id"] if messages else since
+        else:
+            messages, next_before = load_chat_page(saved_name, limit=limit, before=before)
+        return JSONResponse(content={"chat": messages, "next_before": next_before, "last_id": last_id,
+                                     "total": total}, headers=headers)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/chat/{saved_name}/export")
+def export_chat(saved_name: str):
     try:
-        lst = load_chat_history(saved_name)
-        return {"chat": [{"role": r, "text": t} for (r, t) in lst]}
+        return PlainTextResponse(render_chat_markdown(saved_name), media_type="text/markdown")
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -1,4 +1,4 @@
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 CUSTOM_PROMPT = """
 You are an expert assistant. Answer the user's question using only the provided context.
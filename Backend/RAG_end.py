@@ -1,66 +1,364 @@
+import hashlib
 import os
+import queue
+import threading
+import time
 from typing import Optional
-from dotenv import load_dotenv
 from langchain_community.vectorstores import Chroma
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.chat_models import init_chat_model
+from langchain_core.messages import AIMessage, HumanMessage, get_buffer_string
 
 from backend.Prompt_template import prompt
+from backend.models import embeddings, get_llm, EMBEDDING_MODEL_NAME
+from backend.embedding_cache import EmbeddingCache
+from backend.embedding_engine import cache_model_key
+from backend.lru_cache import LRUCache
+from backend.answer_cache import AnswerCache
+from backend import numpy_index
+from backend.metrics import stage, timed
+from backend.context_builder import (
+    BudgetedRetriever,
+    PromptTokenLogger,
+    compose,
+    log_prompt,
+    CONTEXT_TOKEN_BUDGET,
+)
+from backend.utiils import VECTORS_ROOT, vectorstore_dir_for, load_chat_page
 
-load_dotenv()
-google_api_key = os.getenv("GOOGLE_API_KEY")
+# Shared by every collection under data/vectorstores; set EMBED_CACHE_MAX_MB=0 to disable.
+EMBED_CACHE_MAX_MB = int(os.getenv("EMBED_CACHE_MAX_MB", "1024"))
+embedding_cache = None
+if EMBED_CACHE_MAX_MB > 0:
+    embedding_cache = EmbeddingCache(
+        os.path.join(VECTORS_ROOT, ".embedding_cache.sqlite"),
+        model_name=cache_model_key(EMBEDDING_MODEL_NAME),
+        dtype=os.getenv("EMBED_CACHE_DTYPE", "float16"),
+        max_bytes=EMBED_CACHE_MAX_MB * 1024 * 1024,
+    )
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+CHROMA_WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "512"))
+INGEST_PREFETCH_BATCHES = int(os.getenv("INGEST_PREFETCH_BATCHES", "2"))
+# "chroma" queries Chroma directly; "numpy" serves retrieval from a memory-mapped
+# export of each collection (Chroma stays the write-side store).
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+NUMPY_INDEX_DTYPE = os.getenv("NUMPY_INDEX_DTYPE", "float16")
+# "per_collection" keeps one Chroma store per upload; "shared" puts every
+# collection's chunks in one store tagged with saved_name/ext/version metadata.
+INDEX_MODE = os.getenv("INDEX_MODE", "per_collection").lower()
+SHARED_INDEX_DIR = os.path.join(VECTORS_ROOT, ".shared")
+SHARED_COLLECTION = "all_collections"
+# Written into a collection's directory once its chunks are in the shared store.
+SHARED_MARKER = "in_shared_index"
+ALL_COLLECTIONS = "*"
+# Chunks fetched per question; the context builder merges them into CONTEXT_TOKEN_BUDGET.
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "3"))
+# Question/answer turns of chat history kept for condensing follow-up questions.
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "4"))
+
+
+def _batched(items, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
-llm = init_chat_model("google_genai:gemini-2.0-flash", api_key=google_api_key)
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
 
-def create_vectorstore(docs, persist_directory: str, collection_name: str = "default_collection"):
+@timed("embed")
+def embed_texts(texts, batch_size: int = EMBED_BATCH_SIZE):
     """
-    Create or update a Chroma vectorstore without duplication.
-    Compatible with LangChain's Chroma wrapper.
+    Embed a list of texts with `embed_documents`, `batch_size` texts at a time.
+    Texts already in the embedding cache are not sent to the model.
+    """
+    cached = embedding_cache.get_many(texts) if embedding_cache is not None else {}
+    missing = [i for i in range(len(texts)) if i not in cached]
+
+    # Longest first, so each embed_documents batch holds similar lengths and pads less.
+    missing.sort(key=lambda i: len(texts[i]), reverse=True)
+    fresh = []
+    missing_texts = [texts[i] for i in missing]
+    for batch in _batched(missing_texts, batch_size):
+        fresh.extend(embeddings.embed_documents(batch))
+    if embedding_cache is not None and fresh:
+        embedding_cache.put_many(missing_texts, fresh)
+
+    vectors = [None] * len(texts)
+    for i, vector in cached.items():
+        vectors[i] = vector
+    for i, vector in zip(missing, fresh):
+        vectors[i] = vector
+    return vectors
+
+
+def _next_chunk_ids(texts, collection_name: str, seen: dict):
+    ids = []
+    for doc in texts:
+        digest = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:16]
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        ids.append(f"{collection_name}_{digest}" if n == 0 else f"{collection_name}_{digest}_{n}")
+    return ids
+
+
+def chunk_ids_for(texts, collection_name: str):
+    """
+    Stable, content-derived ids: `{collection_name}_{sha1(text)[:16]}`.
+    Repeated identical chunks get an occurrence suffix so ids stay unique.
+    """
+    return _next_chunk_ids(texts, collection_name, {})
+
+
+def _existing_ids(collection, batch_size: int, where=None):
+    out = set()
+    offset = 0
+    while True:
+        page = collection.get(where=where, include=[], limit=batch_size, offset=offset).get("ids", [])
+        out.update(page)
+        if len(page) < batch_size:
+            return out
+        offset += batch_size
+
+
+def _prefetch(iterable, max_ahead: int):
+    """
+    Run `iterable` on a background thread, keeping at most `max_ahead` items
+    buffered. The producer blocks when the consumer falls behind.
+    """
+    q = queue.Queue(maxsize=max_ahead)
+    done = object()
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    threading.Thread(target=produce, daemon=True, name="ingest-prefetch").start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def _iter_chunk_batches(docs, splitter, batch_size: int, counts: dict):
+    """Split documents one at a time and yield chunks in lists of `batch_size`."""
+    pending = []
+    for doc in docs:
+        counts["pages_loaded"] += 1
+        with stage("split"):
+            pending.extend(splitter.split_documents([doc]))
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+
+def _version_file(persist_directory: str) -> str:
+    return os.path.join(persist_directory, "version")
+
+
+def _write_version(persist_directory: str, ids):
+    digest = hashlib.sha1("\n".join(sorted(ids)).encode("utf-8")).hexdigest()[:16]
+    tmp = _version_file(persist_directory) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(digest)
+    os.replace(tmp, _version_file(persist_directory))
+
+
+def collection_version(persist_directory: str) -> str:
+    """Content version of a vectorstore; changes whenever its chunks change."""
+    try:
+        with open(_version_file(persist_directory), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return "unversioned"
+
+
+def _sync_numpy_index(collection, persist_directory: str):
+    version = collection_version(persist_directory)
+    if numpy_index.index_version(persist_directory) != version:
+        with stage("numpy_export"):
+            numpy_index.build_from_chroma(collection, persist_directory, version, dtype=NUMPY_INDEX_DTYPE)
+
+
+_shared_lock = threading.Lock()
+_shared_vectordb = None
+
+
+def shared_vectorstore():
+    """The single Chroma store used when INDEX_MODE=shared."""
+    global _shared_vectordb
+    with _shared_lock:
+        if _shared_vectordb is None:
+            os.makedirs(SHARED_INDEX_DIR, exist_ok=True)
+            _shared_vectordb = Chroma(
+                collection_name=SHARED_COLLECTION,
+                embedding_function=embeddings,
+                persist_directory=SHARED_INDEX_DIR,
+            )
+        return _shared_vectordb
+
+
+def _bump_shared_generation():
+    path = os.path.join(SHARED_INDEX_DIR, "generation")
+    with _shared_lock:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                n = int(f.read().strip() or 0)
+        except FileNotFoundError:
+            n = 0
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(str(n + 1))
+        os.replace(path + ".tmp", path)
+
+
+def index_documents(
+    docs,
+    persist_directory: str,
+    collection_name: str = "default_collection",
+    embed_batch_size: int = EMBED_BATCH_SIZE,
+    write_batch_size: int = CHROMA_WRITE_BATCH_SIZE,
+    progress=None,
+    saved_name: str = None,
+    ext: str = None,
+):
+    """
+    Split `docs` and sync the chunks into Chroma by content id: only chunks
+    that are not already stored get embedded, and chunks that are no longer
+    part of the document are deleted. Returns (vectordb, stats).
+
+    `docs` may be a list or a lazy iterator (see `loaders.iter_docs_by_ext`).
+    Parsing and splitting run on a background thread at most
+    INGEST_PREFETCH_BATCHES batches ahead of embedding, so memory stays
+    bounded by the batch size rather than the document size.
+    `progress(stage, **counts)` is called as the work advances.
+
+    With INDEX_MODE=shared and a `saved_name`, chunks go to the shared store
+    with `saved_name`/`ext`/`version` metadata instead, and `persist_directory`
+    only holds the collection's version file.
     """
+    if progress is None:
+        progress = lambda stage, **counts: None
     os.makedirs(persist_directory, exist_ok=True)
+    started = time.perf_counter()
 
     splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=200)
-    texts = splitter.split_documents(docs)
 
-    vectordb = Chroma(
-        collection_name=collection_name,
-        embedding_function=embeddings,
-        persist_directory=persist_directory
-    )
+    shared = INDEX_MODE == "shared" and saved_name is not None
+    if shared:
+        vectordb = shared_vectorstore()
+        collection_name = saved_name
+        where = {"saved_name": saved_name}
+        metadata = {"saved_name": saved_name, "ext": ext or "", "version": collection_version(persist_directory)}
+    else:
+        vectordb = Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory
+        )
+        where = metadata = None
 
     collection = vectordb._collection
+    existing_ids = _existing_ids(collection, write_batch_size, where)
 
-    ids = [f"{collection_name}_{i}" for i in range(1, len(texts) + 1)]
+    counts = {"pages_loaded": 0}
+    seen_ids = set()
+    digest_counts = {}
+    total = added = 0
+    embed_seconds = 0.0
+    progress("loading", pages_loaded=0, chunks_seen=0, chunks_embedded=0)
 
-    existing_data = collection.get(ids=ids)
-    existing_ids = set(existing_data.get("ids", []))
+    batches = _iter_chunk_batches(docs, splitter, write_batch_size, counts)
+    for texts in _prefetch(batches, INGEST_PREFETCH_BATCHES):
+        ids = _next_chunk_ids(texts, collection_name, digest_counts)
+        seen_ids.update(ids)
+        total += len(texts)
 
-    update_ids = [id for id in ids if id in existing_ids]
-    add_ids = [id for id in ids if id not in existing_ids]
+        new = [(id, doc.page_content) for id, doc in zip(ids, texts) if id not in existing_ids]
+        if new:
+            batch_ids = [id for id, _ in new]
+            documents = [text for _, text in new]
 
-    if update_ids:
-        collection.update(
-            ids=update_ids,
-            documents=[texts[ids.index(id)].page_content for id in update_ids],
-            embeddings=[embeddings.embed_query(texts[ids.index(id)].page_content) for id in update_ids]
-        )
-        print(f"✅ Updated {len(update_ids)} existing documents in '{collection_name}'")
+            t0 = time.perf_counter()
+            vectors = embed_texts(documents, batch_size=embed_batch_size)
+            embed_seconds += time.perf_counter() - t0
 
-    if add_ids:
-        collection.add(
-            ids=add_ids,
-            documents=[texts[ids.index(id)].page_content for id in add_ids],
-            embeddings=[embeddings.embed_query(texts[ids.index(id)].page_content) for id in add_ids]
-        )
-        print(f"🆕 Added {len(add_ids)} new documents to '{collection_name}'")
+            with stage("vector_write"):
+                collection.add(ids=batch_ids, documents=documents, embeddings=vectors,
+                               metadatas=[metadata] * len(batch_ids) if metadata else None)
+            added += len(new)
+        progress("embedding", pages_loaded=counts["pages_loaded"], chunks_seen=total, chunks_embedded=added)
+
+    remove_ids = list(existing_ids - seen_ids)
+    with stage("vector_write"):
+        for batch_ids in _batched(remove_ids, write_batch_size):
+            collection.delete(ids=batch_ids)
+
+    if added:
+        print(f"🆕 Added {added} new documents to '{collection_name}'")
+    if remove_ids:
+        print(f"🗑️ Removed {len(remove_ids)} stale documents from '{collection_name}'")
+
+    progress("committing")
+    with stage("vector_write"):
+        vectordb.persist()
+    if added or remove_ids or not os.path.exists(_version_file(persist_directory)):
+        _write_version(persist_directory, seen_ids)
+        if shared:
+            # Metadata-only update so every chunk carries the new version.
+            metadata = dict(metadata, version=collection_version(persist_directory))
+            for batch_ids in _batched(sorted(seen_ids), write_batch_size):
+                collection.update(ids=batch_ids, metadatas=[metadata] * len(batch_ids))
+            _bump_shared_generation()
+    if shared:
+        open(os.path.join(persist_directory, SHARED_MARKER), "w").close()
+    if VECTOR_BACKEND == "numpy" and not shared:
+        _sync_numpy_index(collection, persist_directory)
+    elapsed = time.perf_counter() - started
+    stats = {
+        "pages": counts["pages_loaded"],
+        "chunks": total,
+        "added": added,
+        "removed": len(remove_ids),
+        "unchanged": total - added,
+        "embed_batch_size": embed_batch_size,
+        "write_batch_size": write_batch_size,
+        "seconds": round(elapsed, 3),
+        "chunks_per_sec": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+        "embed_chunks_per_sec": round(added / embed_seconds, 1) if embed_seconds > 0 else 0.0,
+    }
+    print(f"💾 Vectorstore saved successfully in {persist_directory} "
+          f"({stats['chunks']} chunks, {stats['chunks_per_sec']} chunks/sec)")
+
+    return vectordb, stats
 
-    vectordb.persist()
-    print(f"💾 Vectorstore saved successfully in {persist_directory}")
 
+def create_vectorstore(docs, persist_directory: str, collection_name: str = "default_collection",
+                       saved_name: str = None, ext: str = None):
+    """
+    Create or update a Chroma vectorstore without duplication.
+    Compatible with LangChain's Chroma wrapper.
+    """
+    vectordb, _ = index_documents(docs, persist_directory, collection_name=collection_name,
+                                  saved_name=saved_name, ext=ext)
     return vectordb
 
 
@@ -74,12 +372,213 @@ def load_vectorstore_if_exists(persist_directory: str, collection_name: str = "d
     return None
 
 
-def get_conversational_chain(vectordb):
-    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+def load_numpy_retriever_if_exists(persist_directory: str, collection_name: str = "default_collection"):
+    """
+    Open the memory-mapped index for a vectorstore. Both version markers are
+    plain files, so Chroma is only opened to re-export a missing or stale index.
+    """
+    if not os.path.exists(persist_directory):
+        return None
+    if numpy_index.index_version(persist_directory) != collection_version(persist_directory):
+        vectordb = load_vectorstore_if_exists(persist_directory, collection_name)
+        _sync_numpy_index(vectordb._collection, persist_directory)
+    index = numpy_index.NumpyVectorIndex(numpy_index.index_dir_for(persist_directory))
+    return numpy_index.NumpyRetriever(index=index, embeddings=embeddings, k=RETRIEVAL_K)
+
+
+def get_conversational_chain(vectordb=None, retriever=None):
+    """
+    Chain over `vectordb`, or over an explicit `retriever` (e.g. a NumpyRetriever).
+    Retrieved chunks are merged into a token-budgeted context. The chain has no
+    memory: callers pass `chat_history` (see `chat_history_for`) with each question,
+    so one cached chain can serve concurrent conversations.
+    """
+    # Imported here: langchain.chains is slow to import and only needed once a chain is built.
+    from langchain.chains import ConversationalRetrievalChain
+
+    if retriever is None:
+        retriever = vectordb.as_retriever(search_kwargs={"k": RETRIEVAL_K})
+    if CONTEXT_TOKEN_BUDGET > 0:
+        retriever = BudgetedRetriever(base=retriever, budget_tokens=CONTEXT_TOKEN_BUDGET)
     qa_chain = ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        retriever=vectordb.as_retriever(search_kwargs={"k": 3}),
-        memory=memory,
+        llm=get_llm(),
+        retriever=retriever,
         combine_docs_chain_kwargs={"prompt": prompt},
     )
     return qa_chain
+
+
+def answer_question(chain, question: str, history=(), callbacks=()):
+    """
+    Run `chain` for one question and return the answer. The prompt logger is
+    passed at call time: LangChain only hands call-time callbacks down to the
+    chain's inner LLM runs (condense and answer), not constructor ones.
+    """
+    resp = chain({"question": question, "chat_history": list(history)},
+                 callbacks=list(callbacks) + [PromptTokenLogger()])
+    return resp.get("answer") if isinstance(resp, dict) else str(resp)
+
+
+def chat_history_for(saved_name: str, turns: int = CHAT_HISTORY_TURNS):
+    """The last `turns` question/answer turns of a stored chat, as messages for the chain."""
+    if turns <= 0:
+        return []
+    messages, _ = load_chat_page(saved_name, limit=turns * 2)
+    return [HumanMessage(content=m["text"]) if m["role"] == "user" else AIMessage(content=m["text"])
+            for m in messages]
+
+
+def stream_answer(chain, question: str, history=()):
+    """
+    Yield answer tokens for `question` as the LLM produces them.
+    Mirrors what `chain({"question": ..., "chat_history": history})` does
+    (condense the question with the history, retrieve, stuff the prompt)
+    but streams the final LLM call.
+    """
+    standalone = question
+    if history:
+        with stage("condense"):
+            standalone = chain.question_generator.invoke(
+                {"question": question, "chat_history": get_buffer_string(history)},
+                config={"callbacks": [PromptTokenLogger()]},
+            )["text"]
+
+    with stage("retrieve"):
+        docs = chain.retriever.invoke(standalone)
+    context = "\n\n".join(d.page_content for d in docs)
+
+    final_prompt = prompt.format(context=context, question=standalone)
+    log_prompt("answer", final_prompt)
+
+    with stage("llm"):
+        for chunk in get_llm().stream(final_prompt):
+            token = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if token:
+                yield token
+
+
+def embed_queries(questions):
+    """Embed many questions with one model call (used by /ask_batch)."""
+    with stage("embed"):
+        return embeddings.embed_documents(list(questions))
+
+
+def retrieve_by_vector(retriever, vector):
+    """
+    Top-k documents for an already embedded question, honoring the retriever's
+    k and filter, and its token budget when it is a BudgetedRetriever.
+    """
+    budgeted = retriever if isinstance(retriever, BudgetedRetriever) else None
+    if budgeted is not None:
+        retriever = budgeted.base
+    with stage("retrieve"):
+        if isinstance(retriever, numpy_index.NumpyRetriever):
+            docs = retriever.documents_for_vector(vector)
+        else:
+            kwargs = retriever.search_kwargs
+            docs = retriever.vectorstore.similarity_search_by_vector(
+                vector, k=kwargs.get("k", RETRIEVAL_K), filter=kwargs.get("filter")
+            )
+    return compose(docs, budgeted.budget_tokens) if budgeted is not None else docs
+
+
+def answer_from_docs(question: str, docs) -> str:
+    """One stateless LLM call over `docs`; no chat memory is read or written."""
+    context = "\n\n".join(d.page_content for d in docs)
+    final_prompt = prompt.format(context=context, question=question)
+    log_prompt("answer", final_prompt)
+    with stage("llm"):
+        response = get_llm().invoke(final_prompt)
+    return response.content if hasattr(response, "content") else str(response)
+
+
+# Open Chroma handles (or numpy indexes) + chains per saved_name, so /ask skips
+# the store open and chain construction on repeat questions.
+collection_cache = LRUCache(
+    max_entries=int(os.getenv("COLLECTION_CACHE_SIZE", "32")),
+    ttl_seconds=float(os.getenv("COLLECTION_CACHE_TTL", "900")),
+)
+
+
+def parse_scope(saved_name: str):
+    """
+    Collections a question is asked against: "*" -> None (all of them),
+    "a.pdf,b.pdf" -> ["a.pdf", "b.pdf"]. Several collections need INDEX_MODE=shared.
+    """
+    if saved_name.strip() == ALL_COLLECTIONS:
+        return None
+    return [n.strip() for n in saved_name.split(",") if n.strip()]
+
+
+def is_indexed(persist_directory: str) -> bool:
+    if INDEX_MODE == "shared":
+        return os.path.exists(os.path.join(persist_directory, SHARED_MARKER))
+    return os.path.exists(persist_directory)
+
+
+def scope_version(saved_name: str) -> str:
+    """Answer-cache version for a scope: one collection's version, or a combination."""
+    names = parse_scope(saved_name)
+    if names is None:
+        try:
+            with open(os.path.join(SHARED_INDEX_DIR, "generation"), "r", encoding="utf-8") as f:
+                return "gen-" + f.read().strip()
+        except FileNotFoundError:
+            return "gen-0"
+    return "+".join(collection_version(vectorstore_dir_for(n)) for n in names)
+
+
+def _shared_chain(saved_name: str):
+    names = parse_scope(saved_name)
+    if names is not None and not all(is_indexed(vectorstore_dir_for(n)) for n in names):
+        return None
+    vectordb = shared_vectorstore()
+    search_kwargs = {"k": RETRIEVAL_K}
+    if names:
+        search_kwargs["filter"] = {"saved_name": names[0] if len(names) == 1 else {"$in": names}}
+    return vectordb, get_conversational_chain(retriever=vectordb.as_retriever(search_kwargs=search_kwargs))
+
+
+def delete_from_shared_index(saved_name: str):
+    """Metadata-filtered delete of one collection's chunks from the shared store."""
+    if INDEX_MODE != "shared":
+        return
+    shared_vectorstore()._collection.delete(where={"saved_name": saved_name})
+    _bump_shared_generation()
+
+
+def get_cached_chain(saved_name: str, persist_directory: str = None):
+    """
+    Return the cached chain for `saved_name`, opening the vectorstore on a miss.
+    In shared mode `saved_name` may also be a scope understood by `parse_scope`.
+    """
+    entry = collection_cache.get(saved_name)
+    if entry is None:
+        if INDEX_MODE == "shared":
+            entry = _shared_chain(saved_name)
+            if entry is None:
+                return None
+        elif VECTOR_BACKEND == "numpy":
+            retriever = load_numpy_retriever_if_exists(persist_directory)
+            if retriever is None:
+                return None
+            entry = (retriever, get_conversational_chain(retriever=retriever))
+        else:
+            vectordb = load_vectorstore_if_exists(persist_directory)
+            if vectordb is None:
+                return None
+            entry = (vectordb, get_conversational_chain(vectordb))
+        collection_cache.put(saved_name, entry)
+    return entry[1]
+
+
+def invalidate_collection(saved_name: str):
+    collection_cache.pop(saved_name)
+
+
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "2000")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600))),
+    similarity=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+    embed_fn=lambda text: embeddings.embed_query(text),
+)
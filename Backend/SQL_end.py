@@ -1,34 +1,224 @@
+import json
 import os
-import pandas as pd
+import re
+import time
 import sqlite3
-from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
+from typing import TYPE_CHECKING
 
-load_dotenv()
-google_api_key = os.getenv("GOOGLE_API_KEY")
-llm = init_chat_model("google_genai:gemini-2.0-flash", api_key=google_api_key)
+from backend.lru_cache import LRUCache
+from backend.models import get_llm, embeddings
+from backend.sql_cache import SQLCache
+from backend.query_engine import execute_query, close_db, SQL_MAX_PAGE_SIZE
+from backend.metrics import stage, timed
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def load_csv_to_sql(file_path: str, db_path: str = "data/data.db", table_name: str = None):
+CSV_DB_DIR = os.path.join("data", "csv_dbs")
+
+# (db_path) -> (file signature, schema text)
+schema_cache = LRUCache(max_entries=256, ttl_seconds=float(os.getenv("SCHEMA_CACHE_TTL", "3600")))
+
+
+def _embed_question(text: str):
+    return embeddings.embed_query(text)
+
+
+sql_cache = SQLCache(
+    os.path.join(CSV_DB_DIR, ".sql_cache.sqlite"),
+    max_entries=int(os.getenv("SQL_CACHE_MAX_ENTRIES", "5000")),
+    ttl_seconds=float(os.getenv("SQL_CACHE_TTL", str(7 * 24 * 3600))),
+    similarity=float(os.getenv("SQL_CACHE_SIMILARITY", "0")),
+    embed_fn=_embed_question,
+)
+
+
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "100000"))
+CSV_SAMPLE_ROWS = int(os.getenv("CSV_SAMPLE_ROWS", "10000"))
+# A column is indexed when it has at most this many distinct values...
+INDEX_MAX_DISTINCT = 1000
+# ...or its name ends in one of these words ("id", "user_id", "UserId", "zip_code"),
+# or it is a unique integer column. Free text and floats are never indexed for uniqueness.
+KEY_TOKENS = ("id", "key", "code", "uuid")
+_NAME_TOKEN_SPLIT = re.compile(r"[^0-9A-Za-z]+|(?<=[a-z0-9])(?=[A-Z])")
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _infer_dtypes(sample: "pd.DataFrame") -> dict:
     """
-    Load CSV into SQLite database. Overwrites the table if it exists.
-    Returns (db_path, table_name).
+    Pick compact dtypes from a sample: nullable ints instead of float for
+    int columns with gaps, and `string` instead of object for text.
     """
-    df = pd.read_csv(file_path)
+    import pandas as pd
+
+    dtypes = {}
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_bool_dtype(series):
+            dtypes[col] = "boolean"
+        elif pd.api.types.is_integer_dtype(series):
+            dtypes[col] = "Int64"
+        elif pd.api.types.is_float_dtype(series):
+            non_null = series.dropna()
+            is_int = len(non_null) > 0 and (non_null == non_null.round()).all()
+            dtypes[col] = "Int64" if is_int else "float64"
+        else:
+            dtypes[col] = "string"
+    return dtypes
+
+
+def _rows(chunk: "pd.DataFrame"):
+    chunk = chunk.astype(object)
+    return chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def _is_key_name(col) -> bool:
+    tokens = [t for t in _NAME_TOKEN_SPLIT.split(str(col)) if t]
+    return bool(tokens) and tokens[-1].lower() in KEY_TOKENS
+
+
+def _column_stats(conn, table_name: str, columns, row_count: int, dtypes: dict):
+    """
+    Non-null counts for every column in one scan, then distinct counts one
+    column at a time, stopping at INDEX_MAX_DISTINCT + 1 values so the temp
+    b-tree stays small (`distinct_capped` marks such lower bounds). Only
+    fully populated integer columns get an exact count, to spot unique keys.
+    """
+    if not columns:
+        return {}
+    table = _quote(table_name)
+    counts = conn.execute(f"SELECT {', '.join(f'COUNT({_quote(c)})' for c in columns)} FROM {table}").fetchone()
+    stats = {}
+    for col, non_null in zip(columns, counts):
+        q = _quote(col)
+        distinct = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT DISTINCT {q} FROM {table} WHERE {q} IS NOT NULL LIMIT ?)",
+            (INDEX_MAX_DISTINCT + 1,),
+        ).fetchone()[0]
+        capped = distinct > INDEX_MAX_DISTINCT
+        if capped and dtypes.get(col) == "Int64" and non_null == row_count:
+            distinct = conn.execute(f"SELECT COUNT(DISTINCT {q}) FROM {table}").fetchone()[0]
+            capped = False
+        stats[col] = {"non_null": non_null, "nulls": row_count - non_null, "distinct": distinct,
+                      "distinct_capped": capped}
+    return stats
+
+
+def _index_columns(column_stats: dict, row_count: int, dtypes: dict):
+    out = []
+    for col, st in column_stats.items():
+        if row_count == 0 or st["distinct"] <= 1:
+            continue
+        low_card = not st["distinct_capped"] and st["distinct"] < row_count
+        unique_int = (dtypes.get(col) == "Int64" and not st["distinct_capped"]
+                      and st["distinct"] == st["non_null"] == row_count)
+        if low_card or unique_int or _is_key_name(col):
+            out.append(col)
+    return out
+
+
+@timed("csv_ingest")
+def ingest_csv(file_path: str, db_path: str = "data/data.db", table_name: str = None, chunk_rows: int = CSV_CHUNK_ROWS):
+    """
+    Load a CSV of any size into SQLite:
+    read it in `chunk_rows` chunks with dtypes inferred from a sample,
+    bulk insert everything inside one transaction, then index
+    low-cardinality and key-like columns. Overwrites the table if it exists.
+    Returns a stats dict (row count, per-column stats, indexes, rows/sec);
+    the stats are also written next to the DB as `<db>.stats.json`.
+    """
+    # Imported here: pandas is slow to import and only needed while loading a CSV.
+    import pandas as pd
+
+    started = time.perf_counter()
     if table_name is None:
         table_name = os.path.splitext(os.path.basename(file_path))[0]
         table_name = table_name.replace("-", "_").replace(" ", "_")
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    df.to_sql(table_name, conn, index=False, if_exists="replace")
-    conn.close()
-    return db_path, table_name
+
+    sample = pd.read_csv(file_path, nrows=CSV_SAMPLE_ROWS)
+    dtypes = _infer_dtypes(sample)
+    typed_sample = sample.astype(dtypes)
+    columns = list(sample.columns)
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        # Sorts for DISTINCT and CREATE INDEX spill to disk instead of growing RAM with the data.
+        conn.execute("PRAGMA temp_store=FILE")
+        conn.execute("PRAGMA cache_size=-65536")
+
+        insert = (f"INSERT INTO {_quote(table_name)} ({', '.join(_quote(c) for c in columns)}) "
+                  f"VALUES ({', '.join('?' * len(columns))})")
+        conn.execute("BEGIN")
+        try:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+            conn.execute(pd.io.sql.get_schema(typed_sample, table_name, con=conn))
+            row_count = 0
+            try:
+                for chunk in pd.read_csv(file_path, chunksize=chunk_rows, dtype=dtypes):
+                    conn.executemany(insert, _rows(chunk))
+                    row_count += len(chunk)
+            except (ValueError, TypeError) as e:
+                # A later chunk didn't fit the sampled dtypes; redo with per-chunk inference.
+                print(f"⚠️ Dtype inference from sample failed ({e}); reloading without fixed dtypes")
+                conn.execute(f"DELETE FROM {_quote(table_name)}")
+                dtypes = {c: "auto" for c in columns}
+                row_count = 0
+                for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+                    conn.executemany(insert, _rows(chunk))
+                    row_count += len(chunk)
+
+            column_stats = _column_stats(conn, table_name, columns, row_count, dtypes)
+            indexed = _index_columns(column_stats, row_count, dtypes)
+            for col in indexed:
+                idx_name = f"idx_{table_name}_{col}".replace('"', "")
+                conn.execute(f"CREATE INDEX {_quote(idx_name)} ON {_quote(table_name)} ({_quote(col)})")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "db_path": db_path,
+        "table_name": table_name,
+        "rows": row_count,
+        "columns": {c: dict(column_stats[c], dtype=dtypes[c]) for c in columns},
+        "indexes": indexed,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(row_count / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    with open(f"{db_path}.stats.json", "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+    invalidate_db_caches(db_path)
+    print(f"📊 Loaded {row_count} rows into '{table_name}' ({stats['rows_per_sec']} rows/sec, "
+          f"indexed: {', '.join(indexed) or 'none'})")
+    return stats
 
 
+def load_csv_to_sql(file_path: str, db_path: str = "data/data.db", table_name: str = None):
+    """
+    Load CSV into SQLite database. Overwrites the table if it exists.
+    Returns (db_path, table_name).
+    """
+    stats = ingest_csv(file_path, db_path=db_path, table_name=table_name)
+    return stats["db_path"], stats["table_name"]
+
+
+@timed("schema")
 def get_table_info(db_path: str = "data/data.db") -> str:
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")
     tables = cursor.fetchall()
     schema_text = ""
     for table_name in tables:
@@ -52,17 +242,65 @@ Schema:
 
 Question: {question}
 """
-    response = llm.invoke(prompt)
+    with stage("sql_generate"):
+        response = get_llm().invoke(prompt)
     sql = response.content.strip().replace("```sql", "").replace("```", "").strip()
     return sql
 
 
+def _db_signature(db_path: str):
+    sig = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def get_cached_table_info(db_path: str) -> str:
+    """`get_table_info`, cached until the DB file (or its WAL) changes."""
+    sig = _db_signature(db_path)
+    entry = schema_cache.get(db_path)
+    if entry is not None and entry[0] == sig:
+        return entry[1]
+    schema = get_table_info(db_path)
+    schema_cache.put(db_path, (sig, schema))
+    return schema
+
+
+def invalidate_db_caches(db_path: str):
+    close_db(db_path)
+    schema_cache.pop(db_path)
+    sql_cache.invalidate_db(db_path)
+
+
+def question_to_sql(question: str, db_path: str):
+    """
+    Return (sql, schema, cache_hit). Repeated questions against the same
+    schema are answered from the SQL cache without calling the LLM.
+    """
+    schema = get_cached_table_info(db_path)
+    with stage("sql_cache"):
+        sql = sql_cache.get(db_path, schema, question)
+    if sql is not None:
+        return sql, schema, True
+    sql = generate_sql(question, schema)
+    sql_cache.put(db_path, schema, question, sql)
+    return sql, schema, False
+
+
 def run_query(query: str, db_path: str = "data/data.db"):
-    conn = sqlite3.connect(db_path)
+    """
+    Run `query` through the read-only pooled engine and return at most
+    SQL_MAX_PAGE_SIZE rows as a DataFrame (or the error message as a str).
+    Use `query_engine.execute_query` directly to page through larger results.
+    """
+    import pandas as pd
+
     try:
-        result = pd.read_sql_query(query, conn)
-        conn.close()
-        return result
+        page = execute_query(query, db_path, page_size=SQL_MAX_PAGE_SIZE)
+        return pd.DataFrame(page["rows"], columns=page["columns"])
     except Exception as e:
-        conn.close()
         return str(e)
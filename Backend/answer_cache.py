@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.sql_cache import normalize_question
+
+
+class AnswerCache:
+    """
+    In-memory cache of RAG answers, scoped to (saved_name, collection version)
+    so re-ingesting a document makes its old answers unreachable.
+    Lookups try the normalized question text first, then, when `embed_fn`
+    is set and `similarity` > 0, the most similar cached question in the
+    same scope. LRU eviction past `max_entries`, expiry after `ttl_seconds`.
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 24 * 3600,
+                 similarity: float = 0.95, embed_fn=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.embed_fn = embed_fn
+        self._data = OrderedDict()  # (saved_name, version, question) -> (answer, vector, created_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def _embed(self, question: str):
+        if self.similarity <= 0 or self.embed_fn is None:
+            return None
+        v = np.asarray(self.embed_fn(question), dtype=np.float32)
+        return v / (np.linalg.norm(v) + 1e-12)
+
+    def _expire(self, now: float):
+        if self.ttl_seconds <= 0:
+            return
+        for key in [k for k, (_, _, created) in self._data.items() if now - created > self.ttl_seconds]:
+            del self._data[key]
+
+    def get(self, saved_name: str, version: str, question: str, vector=None):
+        """
+        Return (answer, how, vector). `how` is "hit", "similar" or "miss";
+        pass `vector` back to `put` to avoid embedding the question twice.
+        An already computed question embedding can be passed in as `vector`.
+        """
+        q = normalize_question(question)
+        key = (saved_name, version, q)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[0], "hit", item[1]
+
+        if vector is None:
+            vector = self._embed(q)
+        elif self.similarity > 0:
+            vector = np.asarray(vector, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) + 1e-12)
+        else:
+            vector = None
+        if vector is not None:
+            with self._lock:
+                scoped = [(k, v) for k, v in self._data.items()
+                          if k[0] == saved_name and k[1] == version and v[1] is not None]
+                if scoped:
+                    scores = np.stack([v[1] for _, v in scoped]) @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity:
+                        best_key = scoped[best][0]
+                        self._data.move_to_end(best_key)
+                        self.similar_hits += 1
+                        return scoped[best][1][0], "similar", vector
+
+        with self._lock:
+            self.misses += 1
+        return None, "miss", vector
+
+    def put(self, saved_name: str, version: str, question: str, answer: str, vector=None):
+        q = normalize_question(question)
+        if vector is None:
+            vector = self._embed(q)
+        with self._lock:
+            self._data[(saved_name, version, q)] = (answer, vector, time.time())
+            self._data.move_to_end((saved_name, version, q))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def drop(self, saved_name: str):
+        with self._lock:
+            for key in [k for k in self._data if k[0] == saved_name]:
+                del self._data[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity": self.similarity,
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+            }
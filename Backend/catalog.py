@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from backend.utiils import UPLOAD_DIR, vectorstore_dir_for
+
+CATALOG_PATH = os.path.join("data", "catalog.sqlite")
+CSV_DB_DIR = os.path.join("data", "csv_dbs")
+
+# uploaded -> queued -> indexing -> ready | failed
+STATUSES = ("uploaded", "queued", "indexing", "ready", "failed")
+COLUMNS = (
+    "saved_name", "mode", "ext", "status", "error", "source_sha256", "size",
+    "pages", "chunks", "rows", "index_version", "index_mode", "ingest_seconds",
+    "db_path", "table_name", "vect_dir", "backfilled", "created_at", "updated_at",
+)
+
+
+def mode_for_ext(ext: str) -> str:
+    return "csv" if ext.lower() == "csv" else "rag"
+
+
+def csv_db_path_for(saved_name: str) -> str:
+    return os.path.join(CSV_DB_DIR, f"{saved_name}.db")
+
+
+class Catalog:
+    """
+    SQLite (WAL) record of every collection: mode, source hash and size,
+    page/chunk/row counts, index version, ingest timing and status.
+    Every write bumps a generation counter, which doubles as the ETag of
+    the collection listing.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS collections (
+                    saved_name TEXT PRIMARY KEY,
+                    mode TEXT NOT NULL,
+                    ext TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    source_sha256 TEXT,
+                    size INTEGER,
+                    pages INTEGER,
+                    chunks INTEGER,
+                    rows INTEGER,
+                    index_version TEXT,
+                    index_mode TEXT,
+                    ingest_seconds REAL,
+                    db_path TEXT,
+                    table_name TEXT,
+                    vect_dir TEXT,
+                    backfilled INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            if "backfilled" not in {r["name"] for r in conn.execute("PRAGMA table_info(collections)")}:
+                # Catalogs created before the column existed: their rows count as not backfilled.
+                conn.execute("ALTER TABLE collections ADD COLUMN backfilled INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_collections_mode_status ON collections(mode, status)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn = conn
+            self._backfill(conn)
+        return self._conn
+
+    @contextmanager
+    def transaction(self):
+        """One write transaction (BEGIN IMMEDIATE); bumps the generation on commit."""
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                now = time.time()
+                conn.execute("INSERT INTO meta (key, value) VALUES ('generation', '1') "
+                             "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+                conn.execute("INSERT INTO meta (key, value) VALUES ('updated_at', ?) "
+                             "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (repr(now),))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _backfill(self, conn):
+        """One-time import of uploads that predate the catalog."""
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone():
+            return
+        now = time.time()
+        rows = []
+        if os.path.isdir(UPLOAD_DIR):
+            for entry in os.scandir(UPLOAD_DIR):
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                ext = entry.name.rsplit(".", 1)[-1].lower() if "." in entry.name else ""
+                mode = mode_for_ext(ext)
+                db_path = csv_db_path_for(entry.name) if mode == "csv" else None
+                vect_dir = vectorstore_dir_for(entry.name) if mode == "rag" else None
+                built = os.path.exists(db_path) if mode == "csv" else os.path.exists(vect_dir)
+                st = entry.stat()
+                # Marked backfilled with index_mode NULL: readiness of imported document
+                # collections is re-checked on use.
+                rows.append((entry.name, mode, ext, "ready" if built else "uploaded", st.st_size,
+                             db_path, vect_dir, 1, st.st_mtime, now))
+        with self._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO collections (saved_name, mode, ext, status, size, db_path, vect_dir, "
+                "backfilled, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', '1')")
+            conn.execute("COMMIT")
+        if rows:
+            print(f"📇 Catalog imported {len(rows)} existing collections")
+
+    def register(self, saved_name: str, ext: str, status: str = "uploaded", **fields):
+        """Insert or reset a collection (e.g. a fresh or replaced upload)."""
+        now = time.time()
+        mode = mode_for_ext(ext)
+        values = {
+            "saved_name": saved_name, "mode": mode, "ext": ext.lower(), "status": status, "error": None,
+            "pages": None, "chunks": None, "rows": None, "index_version": None, "index_mode": None,
+            "ingest_seconds": None, "table_name": None, "backfilled": 0,
+            "db_path": csv_db_path_for(saved_name) if mode == "csv" else None,
+            "vect_dir": vectorstore_dir_for(saved_name) if mode == "rag" else None,
+            "created_at": now, "updated_at": now,
+        }
+        values.update(fields)
+        names = list(values)
+        updates = ", ".join(f"{n} = excluded.{n}" for n in names if n not in ("saved_name", "created_at"))
+        with self.transaction() as conn:
+            conn.execute(
+                f"INSERT INTO collections ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+                f"ON CONFLICT(saved_name) DO UPDATE SET {updates}",
+                [values[n] for n in names],
+            )
+
+    def update(self, saved_name: str, **fields):
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown catalog fields: {sorted(unknown)}")
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{n} = ?" for n in fields)
+        with self.transaction() as conn:
+            conn.execute(f"UPDATE collections SET {assignments} WHERE saved_name = ?",
+                         list(fields.values()) + [saved_name])
+
+    def get(self, saved_name: str):
+        with self._lock:
+            row = self._db().execute("SELECT * FROM collections WHERE saved_name = ?", (saved_name,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def list(self, offset: int = 0, limit: int = 100, mode: str = None, status: str = None, q: str = None):
+        """Return (items, total) ordered by name, filtered by mode/status/name substring."""
+        where, params = [], []
+        if mode:
+            where.append("mode = ?")
+            params.append(mode)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if q:
+            where.append("saved_name LIKE ? ESCAPE '\\'")
+            params.append("%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            conn = self._db()
+            total = conn.execute(f"SELECT COUNT(*) FROM collections{clause}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT * FROM collections{clause} ORDER BY saved_name LIMIT ? OFFSET ?",
+                                params + [limit, offset]).fetchall()
+        return [dict(r) for r in rows], total
+
+    def names(self):
+        with self._lock:
+            return [r[0] for r in self._db().execute("SELECT saved_name FROM collections ORDER BY saved_name")]
+
+    def signature(self):
+        """(etag, last_modified) of the whole catalog."""
+        with self._lock:
+            meta = dict(self._db().execute("SELECT key, value FROM meta").fetchall())
+        return f'"{meta.get("generation", "0")}"', float(meta.get("updated_at", 0) or 0)
+
+
+catalog = Catalog()
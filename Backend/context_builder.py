@@ -0,0 +1,177 @@
+import os
+import re
+from typing import List
+
+from langchain_core.callbacks import BaseCallbackHandler, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.metrics import Histogram, register
+
+# Prompt budget for retrieved context; 0 passes the retrieved chunks through untouched.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000"))
+LOG_PROMPT_TOKENS = os.getenv("LOG_PROMPT_TOKENS", "1") == "1"
+
+# Shortest shared text treated as splitter overlap between two chunks.
+MIN_OVERLAP_CHARS = 20
+# The splitter overlaps chunks by 200 chars; look a bit further back to be safe.
+MAX_OVERLAP_CHARS = 400
+# Sentences shorter than this are never treated as duplicates ("Yes.", headings...).
+MIN_DUPLICATE_CHARS = 30
+# Don't bother appending a truncated passage smaller than this.
+MIN_TAIL_TOKENS = 40
+
+_SENTENCE_SPLIT = re.compile(r"((?<=[.!?])\s+|\n+)")
+
+prompt_tokens = register(Histogram(
+    "rag_prompt_tokens", "Estimated tokens per LLM prompt.", ["kind"],
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English with Gemini/GPT tokenizers)."""
+    return (len(text) + 3) // 4
+
+
+def log_prompt(kind: str, text: str) -> int:
+    tokens = estimate_tokens(text)
+    prompt_tokens.observe(tokens, kind)
+    if LOG_PROMPT_TOKENS:
+        print(f"🧮 {kind} prompt: ~{tokens} tokens")
+    return tokens
+
+
+class PromptTokenLogger(BaseCallbackHandler):
+    """Logs the size of every prompt a chain sends to the LLM."""
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        for p in prompts:
+            log_prompt("chain", p)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        for batch in messages:
+            log_prompt("chain", "\n".join(str(m.content) for m in batch))
+
+
+def _merge_pair(a: str, b: str):
+    """`a` and `b` as one passage if one contains the other or `b` continues `a`; else None."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    if len(b) < MIN_OVERLAP_CHARS:
+        return None
+    probe = b[:MIN_OVERLAP_CHARS]
+    pos = a.find(probe, max(0, len(a) - MAX_OVERLAP_CHARS))
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return a + b[len(a) - pos:]
+        pos = a.find(probe, pos + 1)
+    return None
+
+
+def merge_chunks(texts: List[str]) -> List[str]:
+    """
+    Merge chunks that overlap (neighbours from the splitter share up to
+    200 chars) or contain one another. Passages keep the rank of their
+    best-ranked chunk.
+    """
+    passages = []
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        passages.append(text)
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(passages)):
+                for j in range(len(passages)):
+                    if i == j:
+                        continue
+                    joined = _merge_pair(passages[i], passages[j])
+                    if joined is not None:
+                        passages[min(i, j)] = joined
+                        del passages[max(i, j)]
+                        merged = True
+                        break
+                if merged:
+                    break
+    return passages
+
+
+def drop_duplicate_spans(passages: List[str]) -> List[str]:
+    """Remove sentences already present earlier in the context (normalized)."""
+    seen = set()
+    out = []
+    for passage in passages:
+        parts = _SENTENCE_SPLIT.split(passage)
+        kept = []
+        for k in range(0, len(parts), 2):
+            sentence = parts[k]
+            key = " ".join(sentence.lower().split())
+            if len(key) >= MIN_DUPLICATE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(sentence)
+            if k + 1 < len(parts):
+                kept.append(parts[k + 1])
+        text = "".join(kept).strip()
+        if text:
+            out.append(text)
+    return out
+
+
+def _truncate(text: str, tokens: int) -> str:
+    cut = text[:tokens * 4]
+    end = max(cut.rfind(". "), cut.rfind("\n"))
+    return cut[:end + 1] if end > len(cut) // 2 else cut
+
+
+def build_context(texts: List[str], budget_tokens: int = CONTEXT_TOKEN_BUDGET):
+    """
+    Merge, de-duplicate and pack ranked chunk texts into at most
+    `budget_tokens`. Returns (passages, stats).
+    """
+    passages = drop_duplicate_spans(merge_chunks(texts))
+    packed, used = [], 0
+    for passage in passages:
+        tokens = estimate_tokens(passage)
+        if used + tokens <= budget_tokens:
+            packed.append(passage)
+            used += tokens
+            continue
+        remaining = budget_tokens - used
+        if remaining >= MIN_TAIL_TOKENS:
+            tail = _truncate(passage, remaining)
+            packed.append(tail)
+            used += estimate_tokens(tail)
+        break
+    stats = {
+        "chunks": len(texts),
+        "passages": len(packed),
+        "raw_tokens": sum(estimate_tokens(t) for t in texts),
+        "context_tokens": used,
+    }
+    return packed, stats
+
+
+def compose(docs: List[Document], budget_tokens: int = CONTEXT_TOKEN_BUDGET) -> List[Document]:
+    passages, stats = build_context([d.page_content for d in docs], budget_tokens)
+    if LOG_PROMPT_TOKENS:
+        print(f"🧩 Context: {stats['chunks']} chunks -> {stats['passages']} passages, "
+              f"~{stats['raw_tokens']} -> ~{stats['context_tokens']} tokens")
+    return [Document(page_content=p) for p in passages]
+
+
+class BudgetedRetriever(BaseRetriever):
+    """Wraps a retriever and returns merged, de-duplicated passages within a token budget."""
+
+    base: BaseRetriever
+    budget_tokens: int = CONTEXT_TOKEN_BUDGET
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.base.invoke(query, config={"callbacks": run_manager.get_child()})
+        return compose(docs, self.budget_tokens)
@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from html.parser import HTMLParser
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from backend.utiils import CRAWL_ROOT
+
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "0"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "200"))
+CRAWL_CONCURRENCY_PER_HOST = int(os.getenv("CRAWL_CONCURRENCY_PER_HOST", "4"))
+CRAWL_TIMEOUT_SECONDS = float(os.getenv("CRAWL_TIMEOUT_SECONDS", "20"))
+CRAWL_USER_AGENT = os.getenv("CRAWL_USER_AGENT", "file-rag-crawler/1.0")
+
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+_BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "pre"}
+
+
+class _PageParser(HTMLParser):
+    """Visible text, <title> and <a href> links of an HTML page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.links = []
+        self.title = ""
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag == "title":
+            self._in_title = False
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def parse_html(html: str):
+    """Return (title, text, links) for an HTML document."""
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.title.strip(), parser.text(), parser.links
+
+
+def _normalize(url: str) -> str:
+    url, _ = urldefrag(url)
+    return url
+
+
+def _same_site(url: str, root) -> bool:
+    parsed = urlparse(url)
+    return parsed.scheme in ("http", "https") and parsed.netloc == root.netloc
+
+
+def cache_dir_for(saved_name: str) -> str:
+    return os.path.join(CRAWL_ROOT, saved_name)
+
+
+class CrawlState:
+    """
+    Per-collection record of crawled pages: validators (ETag/Last-Modified),
+    content hash and outgoing links in `state.json`, extracted text in `pages/`.
+    Lets a refresh send conditional requests and reuse unchanged pages.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.pages_dir = os.path.join(directory, "pages")
+        self.path = os.path.join(directory, "state.json")
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.pages = json.load(f)
+        except FileNotFoundError:
+            self.pages = {}
+
+    def _text_path(self, url: str) -> str:
+        return os.path.join(self.pages_dir, hashlib.sha1(url.encode("utf-8")).hexdigest()[:20] + ".txt")
+
+    def get(self, url: str):
+        return self.pages.get(url)
+
+    def has_text(self, url: str) -> bool:
+        return os.path.exists(self._text_path(url))
+
+    def read_text(self, url: str) -> str:
+        with open(self._text_path(url), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def put(self, url: str, text: str, **entry):
+        os.makedirs(self.pages_dir, exist_ok=True)
+        with open(self._text_path(url), "w", encoding="utf-8") as f:
+            f.write(text)
+        self.pages[url] = entry
+
+    def save(self, keep):
+        """Persist, forgetting pages that were not reached in this crawl."""
+        for url in [u for u in self.pages if u not in keep]:
+            try:
+                os.remove(self._text_path(url))
+            except FileNotFoundError:
+                pass
+            del self.pages[url]
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.pages, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+async def _fetch(client, url: str, state: CrawlState, limit: asyncio.Semaphore):
+    """
+    Fetch one page conditionally. Returns a dict with `status`
+    ("new" | "changed" | "unchanged" | "skipped" | "error") and, unless
+    skipped/error, the page's text, title and links.
+    """
+    import httpx
+
+    previous = state.get(url)
+    if previous and not state.has_text(url):
+        # The cached text is gone, so a 304 could not be served: fetch in full.
+        previous = None
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    def from_cache(status, error=None):
+        return {"url": url, "status": status, "error": error, "title": previous.get("title", ""),
+                "text": state.read_text(url), "links": previous.get("links", [])}
+
+    try:
+        async with limit:
+            resp = await client.get(url, headers=headers)
+    except httpx.HTTPError as e:
+        # A transient failure keeps the last good copy rather than dropping the page.
+        return from_cache("error", str(e)) if previous else {"url": url, "status": "error", "error": str(e)}
+
+    if resp.status_code == 304 and previous:
+        return from_cache("unchanged")
+    if resp.status_code != 200:
+        error = f"HTTP {resp.status_code}"
+        if previous and resp.status_code >= 500:
+            return from_cache("error", error)
+        return {"url": url, "status": "error", "error": error}
+    content_type = resp.headers.get("content-type", "")
+    if "html" not in content_type and not content_type.startswith("text/"):
+        return {"url": url, "status": "skipped", "error": f"Unsupported content type {content_type}"}
+
+    if "html" in content_type:
+        title, text, links = parse_html(resp.text)
+    else:
+        title, text, links = "", resp.text, []
+    final_url = _normalize(str(resp.url))
+    links = sorted({_normalize(urljoin(final_url, href)) for href in links})
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    status = "new" if previous is None else ("unchanged" if previous.get("sha256") == digest else "changed")
+    state.put(url, text, etag=resp.headers.get("etag"), last_modified=resp.headers.get("last-modified"),
+              sha256=digest, title=title, links=links)
+    return {"url": url, "status": status, "title": title, "text": text, "links": links}
+
+
+async def crawl(start_url: str, state: CrawlState, max_depth: int = CRAWL_MAX_DEPTH,
+                max_pages: int = CRAWL_MAX_PAGES, per_host: int = CRAWL_CONCURRENCY_PER_HOST,
+                timeout: float = CRAWL_TIMEOUT_SECONDS):
+    """
+    Breadth-first, same-host crawl from `start_url`, `max_depth` links deep and
+    at most `max_pages` pages. Each level is fetched concurrently over one pooled
+    client, with at most `per_host` requests in flight per host.
+    Returns (pages, stats); pages are in crawl order. Pages that fail to load
+    are left out unless an earlier crawl cached them.
+    """
+    # Imported here: httpx (and its CLI dependencies) only matter once a crawl runs.
+    import httpx
+
+    started = time.perf_counter()
+    start_url = _normalize(start_url)
+    root = urlparse(start_url)
+    limits = {}
+    seen = {start_url}
+    frontier = [start_url]
+    pages, counts = [], {"new": 0, "changed": 0, "unchanged": 0, "skipped": 0, "error": 0}
+
+    client_limits = httpx.Limits(max_connections=per_host * 4, max_keepalive_connections=per_host * 2)
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True, limits=client_limits,
+                                 headers={"User-Agent": CRAWL_USER_AGENT}) as client:
+        for depth in range(max_depth + 1):
+            if not frontier:
+                break
+            tasks = []
+            for url in frontier:
+                host = urlparse(url).netloc
+                limit = limits.setdefault(host, asyncio.Semaphore(per_host))
+                tasks.append(_fetch(client, url, state, limit))
+            results = await asyncio.gather(*tasks)
+
+            frontier = []
+            for result in results:
+                counts[result["status"]] += 1
+                if result["status"] in ("error", "skipped"):
+                    print(f"⚠️ Crawl {result['status']} {result['url']}: {result.get('error')}")
+                    if "text" not in result:
+                        continue
+                pages.append(result)
+                if depth == max_depth:
+                    continue
+                for link in result["links"]:
+                    if link not in seen and _same_site(link, root) and len(seen) < max_pages:
+                        seen.add(link)
+                        frontier.append(link)
+
+    state.save(keep={p["url"] for p in pages})
+    stats = dict(counts, pages=len(pages), seconds=round(time.perf_counter() - started, 3))
+    print(f"🕸️ Crawled {start_url}: {stats['pages']} pages ({stats['new']} new, {stats['changed']} changed, "
+          f"{stats['unchanged']} unchanged, {stats['error']} errors) in {stats['seconds']}s")
+    return pages, stats
+
+
+def crawl_sync(start_url: str, cache_dir: str, **kwargs):
+    """`crawl` for synchronous callers (ingestion jobs run on worker threads)."""
+    return asyncio.run(crawl(start_url, CrawlState(cache_dir), **kwargs))
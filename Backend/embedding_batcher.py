@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from backend.metrics import Histogram, register
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batches.
+    Callers block in `embed(text)`; one worker thread takes the first waiting
+    request, gathers more for up to `max_wait_ms` or until `max_batch_size`,
+    runs `embed_fn(texts)` once and hands each caller its vector.
+    """
+
+    def __init__(self, embed_fn, max_batch_size: int = 32, max_wait_ms: float = 2.0, name: str = "query"):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = Histogram(f"rag_{name}_embed_batch_size", "Texts per embedding batch.",
+                                     [], buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+        self.wait_seconds = Histogram(f"rag_{name}_embed_queue_seconds",
+                                      "Time a request waited before its batch started.", [],
+                                      buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5))
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True,
+                                                    name=f"{self.name}-embed-batcher")
+                    self._worker.start()
+
+    def embed(self, text: str):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.wait_seconds.observe(started - enqueued)
+            self.batch_sizes.observe(len(batch))
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+            try:
+                vectors = self.embed_fn([text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "queue_depth": self.queue_depth(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    def render(self):
+        gauge = f"rag_{self.name}_embed_queue_depth"
+        return ([f"# HELP {gauge} Embedding requests waiting for a batch.", f"# TYPE {gauge} gauge",
+                 f"{gauge} {self.queue_depth()}"]
+                + self.batch_sizes.render() + self.wait_seconds.render())
+
+    def register_metrics(self):
+        register(self)
+        return self
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+def text_key(text: str, model_name: str) -> str:
+    """Content address for a chunk: sha256 of model name + chunk text."""
+    h = hashlib.sha256()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by chunk-text hash + model name.
+    Vectors are stored as float16 or float32 blobs in one SQLite file that
+    every collection shares. Least recently used rows are evicted once the
+    stored vectors exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str, model_name: str, dtype: str = "float16", max_bytes: int = 1024 * 1024 * 1024):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported cache dtype: {dtype}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.model_name = model_name
+        self.dtype = dtype
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def get_many(self, texts):
+        """Return {index: vector} for every text that is already cached."""
+        keys = [text_key(t, self.model_name) for t in texts]
+        positions = {}
+        for i, k in enumerate(keys):
+            positions.setdefault(k, []).append(i)
+
+        found = {}
+        with self._lock:
+            unique = list(positions)
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    vector = np.frombuffer(blob, dtype=dtype).astype(np.float32).tolist()
+                    for i in positions[key]:
+                        found[i] = vector
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key, _, _ in rows],
+                    )
+            self._conn.commit()
+        return found
+
+    def put_many(self, texts, vectors):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = np.asarray(vector, dtype=self.dtype).tobytes()
+            rows.append((text_key(text, self.model_name), self.model_name, self.dtype, blob, len(blob), now))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dtype, vector, nbytes, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so we don't evict again on the very next insert.
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_used ASC"):
+            if total - freed <= target:
+                break
+            doomed.append((key,))
+            freed += nbytes
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        self._conn.commit()
+        print(f"🧹 Evicted {len(doomed)} cached embeddings ({freed} bytes)")
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM embeddings"
+            ).fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes, "dtype": self.dtype}
@@ -0,0 +1,75 @@
+import os
+
+from langchain_core.embeddings import Embeddings
+
+# torch       - sentence-transformers on PyTorch (what HuggingFaceEmbeddings uses)
+# torch-int8  - same model with Linear layers dynamically quantized to int8
+# onnx        - ONNX Runtime export of the model
+# onnx-int8   - ONNX Runtime, int8-quantized export (EMBED_ONNX_INT8_FILE)
+ENGINES = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+EMBEDDING_ENGINE = os.getenv("EMBEDDING_ENGINE", "torch").lower()
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0")) or None
+EMBED_ENCODE_BATCH = int(os.getenv("EMBED_ENCODE_BATCH", "32"))
+EMBED_ONNX_INT8_FILE = os.getenv("EMBED_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+
+def _ort_session_options(threads):
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    if threads:
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return opts
+
+
+class SentenceTransformerEngine(Embeddings):
+    """
+    CPU embedding engine over sentence-transformers with a selectable backend,
+    explicit thread count and batch size. Inputs are encoded longest-first so
+    each batch pads to similar lengths, and results come back in input order.
+    """
+
+    def __init__(self, model_name: str, engine: str = "torch", threads: int = None, batch_size: int = 32):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown embedding engine '{engine}', expected one of {ENGINES}")
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.engine = engine
+        self.batch_size = batch_size
+
+        if engine.startswith("torch"):
+            import torch
+
+            if threads:
+                torch.set_num_threads(threads)
+            model = SentenceTransformer(model_name, device="cpu")
+            if engine == "torch-int8":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            model_kwargs = {"provider": "CPUExecutionProvider", "session_options": _ort_session_options(threads)}
+            if engine == "onnx-int8":
+                model_kwargs["file_name"] = EMBED_ONNX_INT8_FILE
+            model = SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+        self.model = model
+
+    def embed_documents(self, texts):
+        texts = [t.replace("\n", " ") for t in texts]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        vectors = self.model.encode([texts[i] for i in order], batch_size=self.batch_size,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        out = [None] * len(texts)
+        for pos, i in enumerate(order):
+            out[i] = vectors[pos].tolist()
+        return out
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def cache_model_key(model_name: str, engine: str = EMBEDDING_ENGINE) -> str:
+    """Embedding-cache key for a model; non-default engines get their own entries."""
+    return model_name if engine == "torch" else f"{model_name}@{engine}"
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class Job:
+    def __init__(self, saved_name: str, kind: str):
+        self.id = uuid.uuid4().hex
+        self.saved_name = saved_name
+        self.kind = kind
+        self.stage = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.on_cancel = None
+
+    def update(self, stage: str = None, **progress):
+        if stage is not None:
+            self.stage = stage
+        self.progress.update(progress)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "saved_name": self.saved_name,
+            "kind": self.kind,
+            "stage": self.stage,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs ingestion work on a fixed-size thread pool.
+    `fn(job)` does the work and reports progress through `job.update(...)`;
+    its return value becomes `job.result`. `on_cancel()`, if given, runs when
+    the job is cancelled before it started.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, keep_finished: int = 500):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.keep_finished = keep_finished
+
+    def submit(self, saved_name: str, kind: str, fn, on_cancel=None) -> Job:
+        job = Job(saved_name, kind)
+        job.on_cancel = on_cancel
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn):
+        job.started_at = time.time()
+        job.update(stage="running")
+        try:
+            job.result = fn(job)
+            job.update(stage="done")
+        except Exception as e:
+            job.error = str(e)
+            job.update(stage="failed")
+            print(f"❌ Ingestion job {job.id} for '{job.saved_name}' failed: {e}")
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.stage in FINISHED]
+        if len(finished) <= self.keep_finished:
+            return
+        finished.sort(key=lambda j: j.finished_at or 0)
+        for j in finished[:len(finished) - self.keep_finished]:
+            del self._jobs[j.id]
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        job = self._jobs.get(job_id)
+        if job is None or job.future is None or not job.future.cancel():
+            return False
+        job.update(stage="cancelled")
+        job.finished_at = time.time()
+        if job.on_cancel is not None:
+            job.on_cancel()
+        return True
+
+    def is_pending(self, saved_name: str) -> bool:
+        """True while a job for `saved_name` is queued or running."""
+        return any(j.saved_name == saved_name and j.stage not in FINISHED for j in list(self._jobs.values()))
@@ -1,41 +1,68 @@
-from langchain_community.document_loaders import (
-    PyMuPDFLoader as PyPDFLoader,
-    Docx2txtLoader,
-    TextLoader,
-    WebBaseLoader,
-)
+import os
+
+from langchain_core.documents import Document
+
+from backend.metrics import timed, timed_iter
+from backend.crawler import crawl_sync, cache_dir_for, CRAWL_MAX_DEPTH, CRAWL_MAX_PAGES
+
+
+# The langchain_community loaders are imported where they are used: the package
+# pulls in aiohttp and friends, which would otherwise be paid on every API start.
 
 
 def load_pdf(path: str):
+    from langchain_community.document_loaders import PyMuPDFLoader as PyPDFLoader
     loader = PyPDFLoader(path)
     return loader.load()
 
 
 def load_docx(path: str):
+    from langchain_community.document_loaders import Docx2txtLoader
     loader = Docx2txtLoader(path)
     return loader.load()
 
 
 def load_text(path: str):
+    from langchain_community.document_loaders import TextLoader
     loader = TextLoader(path, encoding="utf-8")
     return loader.load()
 
 
+def _read_url_file(path: str):
+    """
+    A .url collection file: the URL on the first line, then optional crawl
+    settings as `depth=N` / `max_pages=N` lines. Returns (url, options).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f.read().splitlines() if line.strip()]
+    url = lines[0] if lines else ""
+    if not (url.startswith("http://") or url.startswith("https://")):
+        raise ValueError("Invalid URL format")
+    options = {}
+    for line in lines[1:]:
+        key, _, value = line.partition("=")
+        if key.strip() in ("depth", "max_pages") and value.strip().isdigit():
+            options[key.strip()] = int(value)
+    return url, options
+
+
+def _read_url(path: str) -> str:
+    return _read_url_file(path)[0]
+
+
 def load_url_file(path: str):
     """
     `path` is expected to be a file in uploaded_files containing the URL text.
     """
+    from langchain_community.document_loaders import WebBaseLoader
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            url = f.read().strip()
-        if not (url.startswith("http://") or url.startswith("https://")):
-            raise ValueError("Invalid URL format")
-        loader = WebBaseLoader(url)
+        loader = WebBaseLoader(_read_url(path))
         return loader.load()
     except Exception as e:
         raise RuntimeError(f"URL Loader Error: {e}")
 
 
+@timed("parse")
 def load_docs_by_ext(ext: str, path: str):
     ext = ext.lower()
     if ext == "pdf":
@@ -48,3 +75,41 @@ def load_docs_by_ext(ext: str, path: str):
         return load_url_file(path)
     # fallback to text loader
     return load_text(path)
+
+
+def _loader_for(ext: str, path: str):
+    from langchain_community.document_loaders import PyMuPDFLoader as PyPDFLoader, Docx2txtLoader, TextLoader
+    ext = ext.lower()
+    if ext == "pdf":
+        return PyPDFLoader(path)
+    if ext == "docx":
+        return Docx2txtLoader(path)
+    # txt / text and the fallback (URL collections are crawled instead)
+    return TextLoader(path, encoding="utf-8")
+
+
+def iter_crawled_docs(path: str):
+    """
+    Crawl a .url collection (same host, `depth` links deep) and yield one
+    document per page. Pages are fetched conditionally against the previous
+    crawl, so unchanged pages come from the local cache, and since chunk ids
+    are content hashes their chunks are not embedded again.
+    """
+    url, options = _read_url_file(path)
+    pages, _ = crawl_sync(url, cache_dir_for(os.path.basename(path)),
+                          max_depth=options.get("depth", CRAWL_MAX_DEPTH),
+                          max_pages=options.get("max_pages", CRAWL_MAX_PAGES))
+    for page in pages:
+        yield Document(page_content=page["text"], metadata={"source": page["url"], "title": page["title"]})
+
+
+def iter_docs_by_ext(ext: str, path: str):
+    """
+    Lazily yield documents (one per PDF page) instead of materializing the
+    whole file, so parsing can overlap with splitting and embedding.
+    URL collections are crawled (see `iter_crawled_docs`).
+    """
+    if ext.lower() == "url":
+        yield from timed_iter("parse", iter_crawled_docs(path))
+        return
+    yield from timed_iter("parse", _loader_for(ext, path).lazy_load())
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache with an idle TTL.
+    An entry expires when it has not been read for `ttl_seconds`
+    (0 disables expiry). Hit/miss/eviction counters are kept for `stats()`.
+    """
+
+    def __init__(self, max_entries: int = 32, ttl_seconds: float = 0, on_evict=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, last_used: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - last_used > self.ttl_seconds
+
+    def _drop(self, key, value):
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, last_used = item
+            if self._expired(last_used, now):
+                del self._data[key]
+                self._drop(key, value)
+                self.misses += 1
+                return default
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            # Expired entries sit at the front, so sweep them before size eviction.
+            while self._data:
+                oldest_key, (oldest_value, last_used) = next(iter(self._data.items()))
+                if len(self._data) <= self.max_entries and not self._expired(last_used, now):
+                    break
+                del self._data[oldest_key]
+                self._drop(oldest_key, oldest_value)
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[0] if item is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,243 @@
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# METRICS_ENABLED=0 turns every timer below into a no-op and skips the middleware.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Log requests slower than this with their stage breakdown; 0 disables the log.
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# (stage, seconds) pairs recorded while serving the current request, if any.
+_request_stages = ContextVar("request_stages", default=None)
+
+
+class Histogram:
+    """Minimal Prometheus histogram (cumulative buckets, _sum, _count) keyed by label values."""
+
+    def __init__(self, name: str, doc: str, labelnames, buckets=BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        for labels, (counts, total) in items:
+            base = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, labels))
+            sep = "," if base else ""
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {running}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {running}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_seconds = Histogram("rag_stage_seconds", "Time spent per processing stage.", ["stage"])
+request_seconds = Histogram("rag_http_request_seconds", "HTTP request latency.", ["method", "route", "status"])
+_registry = [stage_seconds, request_seconds]
+
+
+def register(metric):
+    """Add a metric (anything with `render() -> [lines]`) to the /metrics output."""
+    _registry.append(metric)
+    return metric
+
+
+def record(stage: str, seconds: float):
+    if not METRICS_ENABLED:
+        return
+    stage_seconds.observe(seconds, stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+
+
+class _NoopStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name: str):
+    """`with stage("embed"): ...` times the block into `rag_stage_seconds`."""
+    return _Stage(name) if METRICS_ENABLED else _NOOP_STAGE
+
+
+def timed(name: str):
+    """Decorator form of `stage`; returns the function untouched when metrics are off."""
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_iter(name: str, iterable):
+    """Yield from `iterable`, timing only the time spent producing each item."""
+    if not METRICS_ENABLED:
+        yield from iterable
+        return
+    it = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            record(name, time.perf_counter() - started)
+            return
+        record(name, time.perf_counter() - started)
+        yield item
+
+
+class StageCallbackHandler(BaseCallbackHandler):
+    """LangChain callbacks that time LLM and retriever runs inside a chain as `llm` / `retrieve`."""
+
+    def __init__(self):
+        self._started = {}
+
+    def _start(self, run_id):
+        self._started[run_id] = time.perf_counter()
+
+    def _end(self, stage_name, run_id):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            record(stage_name, time.perf_counter() - started)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end("llm", run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end("llm", run_id)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end("retrieve", run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end("retrieve", run_id)
+
+
+def chain_callbacks():
+    """`callbacks=` list for a chain call: the stage timer when metrics are on, else empty."""
+    return [StageCallbackHandler()] if METRICS_ENABLED else []
+
+
+def _summarize(stages):
+    totals = {}
+    for name, seconds in stages:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return totals
+
+
+def server_timing(totals: dict, total_seconds: float = None) -> str:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items()]
+    if total_seconds is not None:
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: observes request latency per route, adds a `Server-Timing`
+    header with the stages recorded before the response started, and logs
+    requests slower than SLOW_REQUEST_MS with their full stage breakdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stages = []
+        token = _request_stages.set(stages)
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                header = server_timing(_summarize(stages), time.perf_counter() - started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stages.reset(token)
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            request_seconds.observe(elapsed, scope["method"], route_path, str(status["code"]))
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                breakdown = ", ".join(f"{n}={s * 1000:.0f}ms" for n, s in _summarize(stages).items())
+                print(f"🐢 Slow request {scope['method']} {scope['path']} took {elapsed * 1000:.0f}ms"
+                      f" ({breakdown or 'no stages recorded'})")
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+from backend.embedding_engine import (
+    SentenceTransformerEngine,
+    EMBEDDING_ENGINE,
+    EMBED_THREADS,
+    EMBED_ENCODE_BATCH,
+)
+from backend.embedding_batcher import EmbeddingBatcher
+
+load_dotenv()
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+LLM_MODEL_NAME = "google_genai:gemini-2.0-flash"
+# Concurrent embed_query calls are coalesced into batches of up to this many
+# texts, waiting at most QUERY_EMBED_BATCH_WAIT_MS for company; 1 disables it.
+QUERY_EMBED_BATCH_SIZE = int(os.getenv("QUERY_EMBED_BATCH_SIZE", "32"))
+QUERY_EMBED_BATCH_WAIT_MS = float(os.getenv("QUERY_EMBED_BATCH_WAIT_MS", "2"))
+
+_embeddings_lock = threading.Lock()
+_llm_lock = threading.Lock()
+_embedding_model = None
+_llm = None
+_load_seconds = {}
+_errors = {}
+
+
+def _build_embedding_model():
+    if EMBEDDING_ENGINE == "torch":
+        import torch
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        if EMBED_THREADS:
+            torch.set_num_threads(EMBED_THREADS)
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME,
+                                     encode_kwargs={"batch_size": EMBED_ENCODE_BATCH})
+    return SentenceTransformerEngine(EMBEDDING_MODEL_NAME, engine=EMBEDDING_ENGINE,
+                                     threads=EMBED_THREADS, batch_size=EMBED_ENCODE_BATCH)
+
+
+def get_embedding_model():
+    """The shared sentence-transformers model, loaded on first use."""
+    global _embedding_model
+    if _embedding_model is None:
+        with _embeddings_lock:
+            if _embedding_model is None:
+                started = time.perf_counter()
+                try:
+                    _embedding_model = _build_embedding_model()
+                except Exception as e:
+                    _errors["embeddings"] = str(e)
+                    raise
+                _errors.pop("embeddings", None)
+                _load_seconds["embeddings"] = round(time.perf_counter() - started, 3)
+    return _embedding_model
+
+
+def get_llm():
+    """The one chat model client shared by the RAG and SQL paths, created on first use."""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                started = time.perf_counter()
+                try:
+                    from langchain.chat_models import init_chat_model
+                    _llm = init_chat_model(LLM_MODEL_NAME, api_key=os.getenv("GOOGLE_API_KEY"))
+                except Exception as e:
+                    _errors["llm"] = str(e)
+                    raise
+                _errors.pop("llm", None)
+                _load_seconds["llm"] = round(time.perf_counter() - started, 3)
+    return _llm
+
+
+query_batcher = None
+if QUERY_EMBED_BATCH_SIZE > 1:
+    query_batcher = EmbeddingBatcher(
+        lambda texts: get_embedding_model().embed_documents(texts),
+        max_batch_size=QUERY_EMBED_BATCH_SIZE,
+        max_wait_ms=QUERY_EMBED_BATCH_WAIT_MS,
+    ).register_metrics()
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Embeddings stand-in that defers loading the model until the first call.
+    Query embeddings go through `query_batcher` when it is enabled.
+    """
+
+    def embed_documents(self, texts):
+        return get_embedding_model().embed_documents(texts)
+
+    def embed_query(self, text):
+        if query_batcher is not None:
+            return query_batcher.embed(text)
+        return get_embedding_model().embed_query(text)
+
+
+embeddings = LazyEmbeddings()
+
+
+def set_models(embedding_model=None, llm=None):
+    """Swap in other models (e.g. local fakes for tests and benchmarks)."""
+    global _embedding_model, _llm
+    if embedding_model is not None:
+        _embedding_model = embedding_model
+    if llm is not None:
+        _llm = llm
+
+
+def warmup(background: bool = True):
+    """Load both models now, on a daemon thread unless `background` is False."""
+    def load():
+        for loader in (get_llm, get_embedding_model):
+            try:
+                loader()
+            except Exception as e:
+                print(f"❌ Model warmup failed: {e}")
+
+    if not background:
+        load()
+        return None
+    t = threading.Thread(target=load, daemon=True, name="model-warmup")
+    t.start()
+    return t
+
+
+def status():
+    return {
+        "embeddings": _embedding_model is not None,
+        "llm": _llm is not None,
+        "ready": _embedding_model is not None and _llm is not None,
+        "embedding_engine": EMBEDDING_ENGINE,
+        "query_batching": query_batcher.stats() if query_batcher is not None else None,
+        "load_seconds": dict(_load_seconds),
+        "errors": dict(_errors),
+    }
@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+from typing import List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+INDEX_DIRNAME = "npindex"
+# Rows scored per block, so a query never materializes the whole matrix as float32.
+SEARCH_BLOCK_ROWS = 65536
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def index_dir_for(persist_directory: str) -> str:
+    return os.path.join(persist_directory, INDEX_DIRNAME)
+
+
+def build_from_chroma(collection, persist_directory: str, version: str, dtype: str = "float16",
+                      batch_size: int = 1024) -> str:
+    """
+    Export a Chroma collection to a memory-mappable index next to it:
+    `vectors.npy` (unit-normalized float16/float32, or int8 + `scales.npy`),
+    `chunks.jsonl` + `offsets.npy` for the texts, and `meta.json`.
+    Rows are streamed in `batch_size` batches straight into the memmap.
+    """
+    if dtype not in ("float16", "float32", "int8"):
+        raise ValueError(f"Unsupported index dtype: {dtype}")
+    count = collection.count()
+    target = index_dir_for(persist_directory)
+    tmp = target + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    vectors = scales = None
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    ids = []
+    row = 0
+    with open(os.path.join(tmp, "chunks.jsonl"), "wb") as chunks:
+        for offset in range(0, count, batch_size):
+            page = collection.get(include=["documents", "embeddings"], limit=batch_size, offset=offset)
+            emb = _normalize(np.asarray(page["embeddings"], dtype=np.float32))
+            if vectors is None:
+                dim = emb.shape[1]
+                vectors = np.lib.format.open_memmap(os.path.join(tmp, "vectors.npy"), mode="w+",
+                                                    dtype=dtype, shape=(count, dim))
+                if dtype == "int8":
+                    scales = np.lib.format.open_memmap(os.path.join(tmp, "scales.npy"), mode="w+",
+                                                       dtype=np.float32, shape=(count,))
+            n = len(page["ids"])
+            if dtype == "int8":
+                s = np.maximum(np.abs(emb).max(axis=1), 1e-12) / 127.0
+                vectors[row:row + n] = np.round(emb / s[:, None]).astype(np.int8)
+                scales[row:row + n] = s
+            else:
+                vectors[row:row + n] = emb.astype(dtype)
+            for text in page["documents"]:
+                chunks.write(json.dumps({"text": text}).encode("utf-8") + b"\n")
+                offsets[row + 1] = chunks.tell()
+                row += 1
+            ids.extend(page["ids"])
+
+    if vectors is not None:
+        vectors.flush()
+        del vectors
+    if scales is not None:
+        scales.flush()
+        del scales
+    np.save(os.path.join(tmp, "offsets.npy"), offsets[:row + 1])
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "count": row, "dtype": dtype, "ids": ids}, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+
+def index_version(persist_directory: str):
+    try:
+        with open(os.path.join(index_dir_for(persist_directory), "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f).get("version")
+    except FileNotFoundError:
+        return None
+
+
+class NumpyVectorIndex:
+    """Read-only, memory-mapped exact top-k index written by `build_from_chroma`."""
+
+    def __init__(self, directory: str):
+        self._fd = None
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.version = meta["version"]
+        self.dtype = meta["dtype"]
+        self.ids = meta["ids"]
+        self.count = meta["count"]
+        self.vectors = None
+        self.scales = None
+        if self.count:
+            self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+            if self.dtype == "int8":
+                self.scales = np.load(os.path.join(directory, "scales.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self._fd = os.open(os.path.join(directory, "chunks.jsonl"), os.O_RDONLY)
+
+    def search(self, query_vector, k: int = 3):
+        """Return [(row, score)] for the `k` highest cosine similarities."""
+        if not self.count:
+            return []
+        q = np.asarray(query_vector, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        k = min(k, self.count)
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores = block @ q
+            if self.scales is not None:
+                scores *= self.scales[start:start + SEARCH_BLOCK_ROWS]
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+        order = np.argsort(-best_scores)[:k]
+        return [(int(best_rows[i]), float(best_scores[i])) for i in order]
+
+    def text(self, row: int) -> str:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        # pread keeps concurrent readers from racing on a shared file position.
+        return json.loads(os.pread(self._fd, end - start, start))["text"]
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        # Cached chains are dropped without an explicit close while requests may
+        # still hold them, so the descriptor is released when the last one goes.
+        self.close()
+
+
+class NumpyRetriever(BaseRetriever):
+    """LangChain retriever over a `NumpyVectorIndex`."""
+
+    index: NumpyVectorIndex
+    embeddings: object
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.documents_for_vector(self.embeddings.embed_query(query))
+
+    def documents_for_vector(self, vector) -> List[Document]:
+        return [
+            Document(page_content=self.index.text(row), metadata={"id": self.index.ids[row], "score": score})
+            for row, score in self.index.search(vector, self.k)
+        ]
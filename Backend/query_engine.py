@@ -0,0 +1,134 @@
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from backend.lru_cache import LRUCache
+from backend.metrics import timed
+
+SQL_POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "4"))
+SQL_TIMEOUT_SECONDS = float(os.getenv("SQL_TIMEOUT_SECONDS", "10"))
+SQL_PAGE_SIZE = int(os.getenv("SQL_PAGE_SIZE", "10"))
+SQL_MAX_PAGE_SIZE = int(os.getenv("SQL_MAX_PAGE_SIZE", "1000"))
+
+# SQLite calls the progress handler every N VM instructions.
+_PROGRESS_STEPS = 10000
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Per-DB pool of read-only (`mode=ro`) SQLite connections."""
+
+    def __init__(self, size: int = SQL_POOL_SIZE):
+        self.size = size
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool_for(self, db_path: str):
+        with self._lock:
+            pool = self._pools.get(db_path)
+            if pool is None:
+                pool = self._pools[db_path] = queue.LifoQueue(maxsize=self.size)
+            return pool
+
+    def acquire(self, db_path: str):
+        try:
+            return self._pool_for(db_path).get_nowait()
+        except queue.Empty:
+            uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+            return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def release(self, db_path: str, conn):
+        conn.set_progress_handler(None, 0)
+        try:
+            self._pool_for(db_path).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self, db_path: str):
+        with self._lock:
+            pool = self._pools.pop(db_path, None)
+        while pool is not None and not pool.empty():
+            pool.get_nowait().close()
+
+
+_pool = ConnectionPool()
+# cursor token -> (db_path, sql, offset, page_size)
+_cursors = LRUCache(max_entries=1000, ttl_seconds=600)
+
+
+@timed("sql_execute")
+def _fetch(db_path: str, sql: str, offset: int, limit: int, timeout: float):
+    """
+    Run `sql` and return (columns, rows, has_more) for rows [offset, offset + limit).
+    The statement runs as written (LLM output may end in comments), and rows
+    are stepped through with `fetchmany`, so only the page plus one row is kept.
+    """
+    conn = _pool.acquire(db_path)
+    deadline = time.monotonic() + timeout
+    conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, _PROGRESS_STEPS)
+    try:
+        # "SELECT ...;;" would count as two statements.
+        statement = re.sub(r"(;\s*)+$", ";", sql.strip())
+        cur = conn.execute(statement)
+        skipped = 0
+        while skipped < offset:
+            batch = cur.fetchmany(min(offset - skipped, SQL_MAX_PAGE_SIZE))
+            if not batch:
+                break
+            skipped += len(batch)
+        rows = cur.fetchmany(limit + 1)
+        columns = [d[0] for d in cur.description or []]
+        cur.close()
+    except sqlite3.OperationalError as e:
+        if "interrupted" in str(e):
+            raise QueryTimeout(f"Query exceeded {timeout:g}s") from None
+        raise
+    finally:
+        _pool.release(db_path, conn)
+    has_more = len(rows) > limit
+    return columns, rows[:limit], has_more
+
+
+def _page(db_path: str, sql: str, offset: int, page_size: int, timeout: float):
+    page_size = max(1, min(page_size, SQL_MAX_PAGE_SIZE))
+    columns, rows, has_more = _fetch(db_path, sql, offset, page_size, timeout)
+    cursor = None
+    if has_more:
+        cursor = uuid.uuid4().hex
+        _cursors.put(cursor, (db_path, sql, offset + len(rows), page_size))
+    return {
+        "columns": columns,
+        "rows": [dict(zip(columns, r)) for r in rows],
+        "offset": offset,
+        "has_more": has_more,
+        "cursor": cursor,
+    }
+
+
+def execute_query(sql: str, db_path: str, page_size: int = SQL_PAGE_SIZE, timeout: float = SQL_TIMEOUT_SECONDS):
+    """
+    Execute `sql` read-only and return the first page of rows.
+    Only `page_size` rows are ever pulled from SQLite; when more exist the
+    result carries a `cursor` token for `fetch_page`.
+    """
+    return _page(db_path, sql, 0, page_size, timeout)
+
+
+def fetch_page(cursor: str, timeout: float = SQL_TIMEOUT_SECONDS):
+    """Next page for a cursor token returned by `execute_query`/`fetch_page`, or None if expired."""
+    state = _cursors.pop(cursor)
+    if state is None:
+        return None
+    db_path, sql, offset, page_size = state
+    return _page(db_path, sql, offset, page_size, timeout)
+
+
+def close_db(db_path: str):
+    _pool.close(db_path)
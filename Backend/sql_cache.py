@@ -0,0 +1,158 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    q = re.sub(r"\s+", " ", question.strip().lower())
+    return q.rstrip("?.! ")
+
+
+def schema_fingerprint(schema: str) -> str:
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:32]
+
+
+class SQLCache:
+    """
+    Persistent question -> SQL cache, keyed by (db_path, schema fingerprint,
+    normalized question). With `embed_fn` and a `similarity` threshold > 0,
+    a miss falls back to the most similar cached question for the same
+    schema. Entries expire after `ttl_seconds`; past `max_entries` the least
+    recently used rows are dropped.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, ttl_seconds: float = 7 * 24 * 3600,
+                 similarity: float = 0.0, embed_fn=None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.embed_fn = embed_fn
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sql_cache (
+                db_path TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (db_path, fingerprint, question)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sql_cache_last_used ON sql_cache(last_used)")
+        self._conn.commit()
+
+    def _use_similarity(self) -> bool:
+        return self.similarity > 0 and self.embed_fn is not None
+
+    def get(self, db_path: str, schema: str, question: str):
+        """
+        Return the cached SQL for `question`, or None. The question is only
+        embedded on an exact miss, and outside the lock.
+        """
+        fp = schema_fingerprint(schema)
+        q = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM sql_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT sql FROM sql_cache WHERE db_path = ? AND fingerprint = ? AND question = ?",
+                (db_path, fp, q),
+            ).fetchone()
+            if row is not None:
+                self._touch(db_path, fp, q, now)
+                self.hits += 1
+                return row[0]
+            similar = self._use_similarity() and self._conn.execute(
+                "SELECT 1 FROM sql_cache WHERE db_path = ? AND fingerprint = ? AND embedding IS NOT NULL LIMIT 1",
+                (db_path, fp),
+            ).fetchone() is not None
+            if not similar:
+                self.misses += 1
+                return None
+
+        query = np.asarray(self.embed_fn(q), dtype=np.float32)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, sql, embedding FROM sql_cache "
+                "WHERE db_path = ? AND fingerprint = ? AND embedding IS NOT NULL",
+                (db_path, fp),
+            ).fetchall()
+            if rows:
+                matrix = np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+                scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity:
+                    self._touch(db_path, fp, rows[best][0], now)
+                    self.similar_hits += 1
+                    return rows[best][1]
+            self.misses += 1
+            return None
+
+    def _touch(self, db_path, fp, q, now):
+        self._conn.execute(
+            "UPDATE sql_cache SET last_used = ? WHERE db_path = ? AND fingerprint = ? AND question = ?",
+            (now, db_path, fp, q),
+        )
+        self._conn.commit()
+
+    def put(self, db_path: str, schema: str, question: str, sql: str):
+        fp = schema_fingerprint(schema)
+        q = normalize_question(question)
+        blob = None
+        if self._use_similarity():
+            blob = np.asarray(self.embed_fn(q), dtype=np.float32).tobytes()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_cache (db_path, fingerprint, question, sql, embedding, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (db_path, fp, q, sql, blob, now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM sql_cache WHERE rowid IN "
+                    "(SELECT rowid FROM sql_cache ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def forget(self, db_path: str, schema: str, question: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM sql_cache WHERE db_path = ? AND fingerprint = ? AND question = ?",
+                (db_path, schema_fingerprint(schema), normalize_question(question)),
+            )
+            self._conn.commit()
+
+    def invalidate_db(self, db_path: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sql_cache WHERE db_path = ?", (db_path,))
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+        return {
+            "entries": count,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity": self.similarity,
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+        }
@@ -1,10 +1,21 @@
+import hashlib
+import io
 import os
 import shutil
+import sqlite3
+import threading
 import time
+import uuid
+from typing import Optional
+
+from backend.metrics import timed
 
 UPLOAD_DIR = os.path.join("data", "uploaded_files")
 VECTORS_ROOT = os.path.join("data", "vectorstores")
 CHAT_ROOT = os.path.join("data", "chat_history")
+# Per-URL-collection crawl state and page texts (see crawler.py).
+CRAWL_ROOT = os.path.join("data", "crawl_cache")
+TRASH_ROOT = os.path.join("data", ".trash")
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(VECTORS_ROOT, exist_ok=True)
@@ -13,34 +24,112 @@ os.makedirs(CHAT_ROOT, exist_ok=True)
 
 def clean_filename(filename: str) -> str:
     """Clean filename: lowercase, replace spaces & invalid characters."""
-    base, ext = os.path.splitext(filename)
+    base, ext = os.path.splitext(os.path.basename(filename))
     base = base.strip().replace(" ", "_")
     return f"{base}{ext}"
 
 
-def save_file_bytes(filename: str, content: bytes) -> str:
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "1024")) * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def _claim_name(tmp_path: str, safe_name: str, replace: bool) -> str:
     """
-    Save file contents safely; auto-renames if same name already exists.
-    Example: 'report.pdf' -> 'report_1.pdf'
+    Move the finished temp file into UPLOAD_DIR under `safe_name`, or the
+    first free 'name_1.ext', 'name_2.ext', ... The hard link fails if the
+    target exists, so two concurrent uploads never end up with the same name.
     """
-    safe_name = clean_filename(filename)
-    path = os.path.join(UPLOAD_DIR, safe_name)
+    if replace:
+        os.replace(tmp_path, os.path.join(UPLOAD_DIR, safe_name))
+        return safe_name
 
-    if os.path.exists(path):
-        base, ext = os.path.splitext(safe_name)
-        safe_name = f"{base}_{int(time.time())}{ext}"
-        path = os.path.join(UPLOAD_DIR, safe_name)
+    base, ext = os.path.splitext(safe_name)
+    candidate = safe_name
+    n = 0
+    while True:
+        try:
+            os.link(tmp_path, os.path.join(UPLOAD_DIR, candidate))
+            os.remove(tmp_path)
+            return candidate
+        except FileExistsError:
+            n += 1
+            candidate = f"{base}_{n}{ext}"
 
-    with open(path, "wb") as f:
-        f.write(content)
 
-    return safe_name
+class UploadWriter:
+    """
+    Receives an upload chunk by chunk into a temp file inside UPLOAD_DIR,
+    hashing as it goes. `write` raises UploadTooLarge as soon as more than
+    `max_bytes` have arrived; `claim` then renames the file into place, so
+    the bytes are written to disk exactly once.
+    """
+
+    def __init__(self, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.max_bytes = max_bytes
+        self.tmp_path = os.path.join(UPLOAD_DIR, f".upload-{uuid.uuid4().hex}.part")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self._file = open(self.tmp_path, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the limit of {self.max_bytes} bytes")
+        self.digest.update(chunk)
+        self._file.write(chunk)
+
+    def claim(self, filename: str, replace: bool = False):
+        """Returns (saved_name, sha256_hex, size)."""
+        try:
+            self._file.close()
+            saved_name = _claim_name(self.tmp_path, clean_filename(filename), replace)
+        finally:
+            self.discard()
+        return saved_name, self.digest.hexdigest(), self.size
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def save_upload_stream(filename: str, stream, replace: bool = False, max_bytes: int = MAX_UPLOAD_BYTES):
+    """
+    Copy a file-like `stream` into UPLOAD_DIR in fixed-size chunks (see UploadWriter).
+    Returns (saved_name, sha256_hex, size).
+    """
+    writer = UploadWriter(max_bytes)
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            writer.write(chunk)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.claim(filename, replace)
+
+
+def save_file_bytes(filename: str, content: bytes, replace: bool = False) -> str:
+    """
+    Save file contents safely; auto-renames if same name already exists.
+    Example: 'report.pdf' -> 'report_1.pdf'
+    With `replace=True` the existing file is overwritten so its collection
+    can be re-indexed in place.
+    """
+    saved_name, _, _ = save_upload_stream(filename, io.BytesIO(content), replace=replace, max_bytes=len(content))
+    return saved_name
+
 
 def list_collections():
-    """Return saved filenames sorted."""
-    if not os.path.exists(UPLOAD_DIR):
-        return []
-    return sorted(os.listdir(UPLOAD_DIR))
+    """Return saved filenames sorted (from the catalog, no directory scan)."""
+    from backend.catalog import catalog  # catalog imports this module
+    return catalog.names()
 
 
 def collection_path(saved_name: str) -> str:
@@ -58,17 +147,35 @@ def chat_file_for(saved_name: str) -> str:
     return os.path.join(CHAT_ROOT, f"{safe}.md")
 
 
-def save_chat_history(saved_name: str, chat_list):
-    path = chat_file_for(saved_name)
-    with open(path, "w", encoding="utf-8") as f:
-        for role, text in chat_list:
-            f.write(f"**{role.capitalize()}:** {text}\n\n")
+CHAT_DB_PATH = os.path.join(CHAT_ROOT, "chat.sqlite")
+_chat_lock = threading.Lock()
+_chat_conn = None
 
 
-def load_chat_history(saved_name: str):
-    path = chat_file_for(saved_name)
-    if not os.path.exists(path):
-        return []
+def _chat_db():
+    """Shared SQLite (WAL) connection for chat messages; appends are single INSERTs."""
+    global _chat_conn
+    if _chat_conn is None:
+        conn = sqlite3.connect(CHAT_DB_PATH, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                saved_name TEXT NOT NULL,
+                role TEXT NOT NULL,
+                text TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_name_id ON messages(saved_name, id)")
+        conn.execute("CREATE TABLE IF NOT EXISTS imported (saved_name TEXT PRIMARY KEY)")
+        conn.commit()
+        _chat_conn = conn
+    return _chat_conn
+
+
+def _parse_chat_markdown(path: str):
     out = []
     with open(path, "r", encoding="utf-8") as f:
         lines = f.read().splitlines()
@@ -81,27 +188,172 @@ def load_chat_history(saved_name: str):
     return out
 
 
+def _import_legacy_chat(conn, saved_name: str):
+    """One-time import of an old markdown chat file into the message store."""
+    if conn.execute("SELECT 1 FROM imported WHERE saved_name = ?", (saved_name,)).fetchone():
+        return
+    path = chat_file_for(saved_name)
+    if os.path.exists(path):
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO messages (saved_name, role, text, created_at) VALUES (?, ?, ?, ?)",
+            [(saved_name, role, text, now) for role, text in _parse_chat_markdown(path)],
+        )
+        os.remove(path)
+    conn.execute("INSERT OR IGNORE INTO imported (saved_name) VALUES (?)", (saved_name,))
+    conn.commit()
+
+
+def save_chat_history(saved_name: str, chat_list):
+    """Replace the whole history of `saved_name` with `chat_list`."""
+    with _chat_lock:
+        conn = _chat_db()
+        _import_legacy_chat(conn, saved_name)
+        now = time.time()
+        conn.execute("DELETE FROM messages WHERE saved_name = ?", (saved_name,))
+        conn.executemany(
+            "INSERT INTO messages (saved_name, role, text, created_at) VALUES (?, ?, ?, ?)",
+            [(saved_name, role, text, now) for role, text in chat_list],
+        )
+        conn.commit()
+
+
+def load_chat_page(saved_name: str, limit: Optional[int] = None, before: Optional[int] = None):
+    """
+    Return (messages, next_before) in chronological order.
+    `messages` are the newest `limit` messages with id < `before`;
+    pass `next_before` back as `before` to fetch the previous page.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    with _chat_lock:
+        conn = _chat_db()
+        _import_legacy_chat(conn, saved_name)
+        sql = "SELECT id, role, text FROM messages WHERE saved_name = ?"
+        params = [saved_name]
+        if before is not None:
+            sql += " AND id < ?"
+            params.append(before)
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = conn.execute(sql, params).fetchall()
+
+    next_before = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_before = rows[-1][0]
+    rows.reverse()
+    return [{"id": i, "role": r, "text": t} for (i, r, t) in rows], next_before
+
+
+def load_chat_since(saved_name: str, since: int, limit: Optional[int] = None):
+    """Messages with id > `since`, oldest first (at most `limit`)."""
+    with _chat_lock:
+        conn = _chat_db()
+        _import_legacy_chat(conn, saved_name)
+        sql = "SELECT id, role, text FROM messages WHERE saved_name = ? AND id > ? ORDER BY id ASC"
+        params = [saved_name, since]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = conn.execute(sql, params).fetchall()
+    return [{"id": i, "role": r, "text": t} for (i, r, t) in rows]
+
+
+def chat_signature(saved_name: str):
+    """(etag, last_modified, count, last_id) of a chat; ids are AUTOINCREMENT so never reused."""
+    with _chat_lock:
+        conn = _chat_db()
+        _import_legacy_chat(conn, saved_name)
+        count, last_id, last_at = conn.execute(
+            "SELECT COUNT(*), MAX(id), MAX(created_at) FROM messages WHERE saved_name = ?", (saved_name,)
+        ).fetchone()
+    return f'"{count}-{last_id or 0}"', last_at or 0.0, count, last_id or 0
+
+
+def load_chat_history(saved_name: str):
+    messages, _ = load_chat_page(saved_name)
+    return [(m["role"], m["text"]) for m in messages]
+
+
+@timed("chat_persist")
 def append_to_chat(saved_name: str, role: str, text: str):
-    lst = load_chat_history(saved_name)
-    lst.append((role, text))
-    save_chat_history(saved_name, lst)
+    with _chat_lock:
+        conn = _chat_db()
+        _import_legacy_chat(conn, saved_name)
+        conn.execute(
+            "INSERT INTO messages (saved_name, role, text, created_at) VALUES (?, ?, ?, ?)",
+            (saved_name, role, text, time.time()),
+        )
+        conn.commit()
 
 
-def delete_collection(saved_name: str) -> bool:
-    """Delete uploaded file, its vectorstore, and chat history."""
-    try:
-        fpath = collection_path(saved_name)
-        if os.path.exists(fpath):
-            os.remove(fpath)
+@timed("chat_persist")
+def append_many_to_chat(saved_name: str, messages):
+    """Append [(role, text), ...] in one transaction."""
+    with _chat_lock:
+        conn = _chat_db()
+        _import_legacy_chat(conn, saved_name)
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO messages (saved_name, role, text, created_at) VALUES (?, ?, ?, ?)",
+            [(saved_name, role, text, now) for role, text in messages],
+        )
+        conn.commit()
+
 
-        vectdir = vectorstore_dir_for(saved_name)
-        if os.path.exists(vectdir):
-            shutil.rmtree(vectdir)
+def render_chat_markdown(saved_name: str) -> str:
+    """Markdown export of the chat, same format the old .md files used."""
+    return "".join(f"**{role.capitalize()}:** {text}\n\n" for role, text in load_chat_history(saved_name))
 
-        chatf = chat_file_for(saved_name)
-        if os.path.exists(chatf):
-            os.remove(chatf)
 
-        return True
-    except Exception:
+def delete_chat(saved_name: str):
+    with _chat_lock:
+        conn = _chat_db()
+        conn.execute("DELETE FROM messages WHERE saved_name = ?", (saved_name,))
+        conn.execute("DELETE FROM imported WHERE saved_name = ?", (saved_name,))
+        conn.commit()
+
+
+def delete_collection(saved_name: str) -> bool:
+    """
+    Delete an uploaded file with its vectorstore, CSV database, crawl cache,
+    chat history and catalog entry, all or nothing. Files are first moved
+    into a trash directory while the catalog row is deleted in one
+    transaction; on any failure they are moved back and the row kept.
+    """
+    from backend.catalog import catalog, csv_db_path_for  # catalog imports this module
+    db_path = csv_db_path_for(saved_name)
+    paths = [
+        collection_path(saved_name),
+        vectorstore_dir_for(saved_name),
+        db_path, db_path + "-wal", db_path + "-shm", db_path + ".stats.json",
+        os.path.join(CRAWL_ROOT, saved_name),
+        chat_file_for(saved_name),
+    ]
+    trash = os.path.join(TRASH_ROOT, uuid.uuid4().hex)
+    moved = []
+    try:
+        with catalog.transaction() as conn:
+            conn.execute("DELETE FROM collections WHERE saved_name = ?", (saved_name,))
+            for i, path in enumerate(paths):
+                if os.path.lexists(path):
+                    os.makedirs(trash, exist_ok=True)
+                    dest = os.path.join(trash, str(i))
+                    os.rename(path, dest)
+                    moved.append((path, dest))
+    except Exception as e:
+        for path, dest in reversed(moved):
+            try:
+                os.rename(dest, path)
+            except OSError:
+                pass
+        shutil.rmtree(trash, ignore_errors=True)
+        print(f"❌ Delete of {saved_name} rolled back: {e}")
         return False
+
+    delete_chat(saved_name)
+    shutil.rmtree(trash, ignore_errors=True)
+    return True
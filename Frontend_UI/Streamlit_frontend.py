@@ -1,9 +1,125 @@
 import streamlit as st
+import json
 import requests
+import time
 from io import BytesIO
 from urllib.parse import urlparse  # ✅ For clean URL naming
 
 API_BASE = "http://localhost:8000"
+# How long the UI waits on an ingestion job before giving up on it.
+JOB_WAIT_TIMEOUT_SECONDS = 1800
+
+
+@st.cache_resource
+def http_session():
+    """One pooled, keep-alive session for the whole Streamlit server."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+http = http_session()
+
+
+def get_collections():
+    """Collection names, revalidated with If-None-Match; a 304 reuses the local copy."""
+    cached = st.session_state.get("collections_cache")
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    resp = http.get(f"{API_BASE}/collections", headers=headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        return cached["collections"]
+    resp.raise_for_status()
+    data = resp.json()
+    cols = list(data.get("collections", []))
+    while data.get("next_offset") is not None:
+        page = http.get(f"{API_BASE}/collections", params={"offset": data["next_offset"]}, timeout=30)
+        page.raise_for_status()
+        data = page.json()
+        cols.extend(data.get("collections", []))
+    st.session_state.collections_cache = {"etag": resp.headers.get("ETag"), "collections": cols}
+    return cols
+
+
+def get_chat(saved_name: str):
+    """
+    Chat messages for `saved_name`, kept in session state. Only messages after
+    the last one seen are fetched; unchanged chats come back as 304.
+    """
+    chats = st.session_state.setdefault("chats", {})
+    cached = chats.get(saved_name)
+    params, headers = {}, {}
+    if cached:
+        params["since"] = cached["last_id"]
+        headers["If-None-Match"] = cached["etag"]
+    resp = http.get(f"{API_BASE}/chat/{saved_name}", params=params, headers=headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        return cached["messages"]
+    resp.raise_for_status()
+    data = resp.json()
+    messages = (cached["messages"] if cached else []) + data.get("chat", [])
+    if len(messages) != data.get("total", len(messages)):
+        # Cleared or rewritten on the server: start over with a full fetch.
+        chats.pop(saved_name, None)
+        return get_chat(saved_name) if cached else messages
+    chats[saved_name] = {"etag": resp.headers.get("ETag"), "last_id": data.get("last_id", 0), "messages": messages}
+    return messages
+
+
+def forget_chat(saved_name: str):
+    st.session_state.setdefault("chats", {}).pop(saved_name, None)
+
+
+def iter_sse(resp):
+    """Yield (event, data) pairs from a Server-Sent Events response."""
+    event, data_lines = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+
+def wait_for_job(job_id: str, timeout: float = JOB_WAIT_TIMEOUT_SECONDS):
+    """
+    Poll the ingestion job until it finishes, showing its stage and progress.
+    Stops early if the job is gone (API restarted), the API errors, or
+    `timeout` seconds pass; the returned job then carries an `error`.
+    """
+    status = st.empty()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            resp = http.get(f"{API_BASE}/jobs/{job_id}", timeout=10)
+        except requests.RequestException as e:
+            status.empty()
+            return {"stage": "failed", "error": f"Lost contact with the API: {e}"}
+        if resp.status_code == 404:
+            status.empty()
+            return {"stage": "failed", "error": "The ingestion job is gone (was the API restarted?)"}
+        if resp.status_code != 200:
+            status.empty()
+            return {"stage": "failed", "error": resp.text}
+        job = resp.json()
+        stage = job.get("stage")
+        prog = job.get("progress", {})
+        status.info(f"⏳ {stage} — pages: {prog.get('pages_loaded', 0)}, "
+                    f"chunks: {prog.get('chunks_seen', 0)} seen / {prog.get('chunks_embedded', 0)} embedded")
+        if stage in ("done", "failed", "cancelled"):
+            status.empty()
+            return job
+        if time.monotonic() > deadline:
+            status.empty()
+            return dict(job, error=f"Still {stage} after {int(timeout)}s, check the collection later")
+        time.sleep(0.5)
+
 
 st.set_page_config(page_title="Chat from API-backed files", layout="wide")
 
@@ -18,6 +134,8 @@ with left:
 
     if file_type == "URL":
         url_input = st.text_input("Enter URL", key="url_input")
+        crawl_depth = st.number_input("Crawl depth (0 = this page only)", min_value=0, max_value=5, value=0,
+                                      key="crawl_depth")
 
     if st.button("Upload"):
         if file_type == "URL":
@@ -32,13 +150,17 @@ with left:
                 if not safe_name.endswith(".url"):
                     safe_name += ".url"
 
-                b = url_input.encode("utf-8")
+                b = f"{url_input}\ndepth={int(crawl_depth)}\n".encode("utf-8")
                 files = {"file": (safe_name, BytesIO(b), "text/plain")}
                 data = {"file_type": "url"}
 
-                resp = requests.post(f"{API_BASE}/upload", files=files, data=data)
-                if resp.status_code == 200:
-                    st.success(f"✅ URL '{safe_name}' uploaded successfully.")
+                resp = http.post(f"{API_BASE}/upload", files=files, data=data)
+                if resp.status_code in (200, 202):
+                    job = wait_for_job(resp.json()["job_id"])
+                    if job.get("stage") == "done":
+                        st.success(f"✅ URL '{safe_name}' uploaded successfully.")
+                    else:
+                        st.error(job.get("error") or f"Ingestion {job.get('stage')}")
                 else:
                     st.error(resp.text)
 
@@ -50,9 +172,13 @@ with left:
                     "file": (uploaded.name, uploaded.getbuffer(), uploaded.type or "application/octet-stream")
                 }
                 data = {"file_type": file_type.lower()}
-                resp = requests.post(f"{API_BASE}/upload", files=files, data=data)
-                if resp.status_code == 200:
-                    st.success("✅ File uploaded successfully.")
+                resp = http.post(f"{API_BASE}/upload", files=files, data=data)
+                if resp.status_code in (200, 202):
+                    job = wait_for_job(resp.json()["job_id"])
+                    if job.get("stage") == "done":
+                        st.success("✅ File uploaded successfully.")
+                    else:
+                        st.error(job.get("error") or f"Ingestion {job.get('stage')}")
                 else:
                     st.error(resp.text)
 
@@ -60,11 +186,7 @@ with left:
     st.subheader("Saved collections")
 
     try:
-        resp = requests.get(f"{API_BASE}/collections")
-        if resp.status_code == 200:
-            cols = resp.json().get("collections", [])
-        else:
-            cols = []
+        cols = get_collections()
     except Exception:
         cols = []
 
@@ -74,7 +196,7 @@ with left:
         if selection == "(none)":
             st.warning("Choose a collection")
         else:
-            resp = requests.post(f"{API_BASE}/activate", data={"saved_name": selection})
+            resp = http.post(f"{API_BASE}/activate", data={"saved_name": selection})
             if resp.status_code == 200:
                 st.success("✅ File activated successfully.")
             else:
@@ -84,17 +206,33 @@ with left:
         if selection == "(none)":
             st.warning("Choose a collection")
         else:
-            resp = requests.delete(f"{API_BASE}/collections/{selection}")
+            resp = http.delete(f"{API_BASE}/collections/{selection}")
+            forget_chat(selection)
             if resp.status_code == 200:
                 st.success("✅ File deleted successfully.")
             else:
                 st.error(resp.text)
 
+    if st.button("Refresh selected"):
+        if selection == "(none)":
+            st.warning("Choose a collection")
+        else:
+            resp = http.post(f"{API_BASE}/collections/{selection}/refresh")
+            if resp.status_code == 202:
+                job = wait_for_job(resp.json()["job_id"])
+                if job.get("stage") == "done":
+                    st.success("✅ Collection refreshed.")
+                else:
+                    st.error(job.get("error") or f"Refresh {job.get('stage')}")
+            else:
+                st.error(resp.text)
+
     if st.button("Clear chat"):
         if selection == "(none)":
             st.warning("Choose a collection")
         else:
-            resp = requests.post(f"{API_BASE}/clear_chat", data={"saved_name": selection})
+            resp = http.post(f"{API_BASE}/clear_chat", data={"saved_name": selection})
+            forget_chat(selection)
             if resp.status_code == 200:
                 st.success("✅ Chat cleared.")
             else:
@@ -124,51 +262,53 @@ with right:
         else:
             data = {"saved_name": st.session_state.active, "question": q}
 
-            with st.spinner("🤔 Thinking... please wait while I process your question..."):
-                try:
-                    resp = requests.post(f"{API_BASE}/ask", data=data)
-                except Exception as e:
-                    st.error(f"Request failed: {e}")
-                    st.stop()
-
-            if resp.status_code == 200:
-                out = resp.json()
-                if out.get("mode") == "csv":
-                    st.success("✅ SQL query executed successfully.")
-                    st.write("**SQL Query:**")
-                    st.code(out.get("sql") or "N/A", language="sql")
-
-                    results = out.get("result", [])
-                    if results:
-                        st.dataframe(results)
-
-                    st.markdown(f"**🤖 Assistant:** {out.get('assistant')}")
-                elif out.get("mode") == "rag":
-                    st.markdown(f"**🤖 Assistant:** {out.get('answer') or out.get('assistant')}")
-                else:
-                    st.write(out)
-            else:
-                st.error(f"❌ {resp.text}")
+            answer_box = st.empty()
+            answer_box.markdown("🤔 Thinking... please wait while I process your question...")
+            tokens, rows = [], []
+            try:
+                with http.post(f"{API_BASE}/ask/stream", data=data, stream=True) as resp:
+                    if resp.status_code != 200:
+                        st.error(f"❌ {resp.text}")
+                        st.stop()
+                    for event, payload in iter_sse(resp):
+                        if event == "token":
+                            tokens.append(payload.get("text", ""))
+                            answer_box.markdown(f"**🤖 Assistant:** {''.join(tokens)}▌")
+                        elif event == "sql":
+                            answer_box.empty()
+                            st.write("**SQL Query:**")
+                            st.code(payload.get("sql") or "N/A", language="sql")
+                            rows_box = st.empty()
+                        elif event == "row":
+                            rows.append(payload)
+                            rows_box.dataframe(rows)
+                        elif event == "done":
+                            if payload.get("mode") == "csv":
+                                st.success("✅ SQL query executed successfully.")
+                                st.markdown(f"**🤖 Assistant:** {payload.get('assistant')}")
+                            else:
+                                answer_box.markdown(f"**🤖 Assistant:** {payload.get('answer')}")
+                        elif event == "error":
+                            st.error(f"❌ {payload.get('error')}")
+            except Exception as e:
+                st.error(f"Request failed: {e}")
+                st.stop()
 
     st.markdown("---")
     st.subheader("Conversation")
 
     try:
-        c = requests.get(f"{API_BASE}/chat/{st.session_state.active}")
-        if c.status_code == 200:
-            chat = c.json().get("chat", [])
-            for msg in chat:
-                role = msg.get("role")
-                text = msg.get("text")
-                if role == "user":
-                    st.markdown(f"**🧑 You:** {text}")
+        chat = get_chat(st.session_state.active)
+        for msg in chat:
+            role = msg.get("role")
+            text = msg.get("text")
+            if role == "user":
+                st.markdown(f"**🧑 You:** {text}")
+            else:
+                tstr = (text or "").strip()
+                if tstr.upper().startswith("SELECT"):
+                    st.code(tstr, language="sql")
                 else:
-                    tstr = (text or "").strip()
-                    if tstr.upper().startswith("SELECT"):
-                        st.code(tstr, language="sql")
-                    else:
-                        st.markdown(f"**🤖 Bot:** {text}")
-        else:
-            st.error("Failed to load chat history.")
+                    st.markdown(f"**🤖 Bot:** {text}")
     except Exception as e:
         st.error(f"Error loading chat: {e}")
@@ -0,0 +1,101 @@
+"""
+Throughput and retrieval agreement of the CPU embedding engines against the
+default PyTorch model on a fixed, generated corpus.
+
+    python benchmarks/bench_embedding_engines.py --engines torch torch-int8 onnx onnx-int8 --threads 4
+
+Agreement is the mean overlap of each engine's top-k neighbours with the
+`torch` engine's for the same queries, plus the mean cosine between the two
+engines' vectors for identical texts.
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+import repo_path  # noqa: F401
+from backend.embedding_engine import ENGINES, SentenceTransformerEngine
+from backend.models import EMBEDDING_MODEL_NAME
+
+SUBJECTS = ["The invoice", "Our refund policy", "The onboarding guide", "This contract", "The API",
+            "The warehouse", "Quarterly revenue", "The support team", "The privacy notice", "Shipping"]
+VERBS = ["describes", "requires", "limits", "explains", "covers", "excludes", "updates", "defines"]
+OBJECTS = ["late payment fees", "data retention periods", "employee travel expenses", "return windows",
+           "rate limits per key", "holiday schedules", "customs declarations", "password resets",
+           "termination clauses", "inventory audits", "overtime approval", "currency conversion"]
+
+
+def make_corpus(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        sentences = [f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}."
+                     for _ in range(rng.randint(1, 12))]
+        out.append(" ".join(sentences))
+    return out
+
+
+def topk(matrix, queries, k):
+    m = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(q @ m.T), axis=1)[:, :k]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES)
+    ap.add_argument("--n", type=int, default=2000, help="corpus size")
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--threads", type=int, default=0)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--out", help="write results as JSON to this path")
+    args = ap.parse_args()
+
+    corpus = make_corpus(args.n)
+    queries = [f"What does {random.Random(i).choice(SUBJECTS).lower()} say about {random.Random(i + 1).choice(OBJECTS)}?"
+               for i in range(args.queries)]
+
+    engines = ["torch"] + [e for e in args.engines if e != "torch"]
+    results = {"model": EMBEDDING_MODEL_NAME, "n": args.n, "k": args.k, "threads": args.threads or None, "engines": {}}
+    baseline = None
+    for name in engines:
+        t0 = time.perf_counter()
+        engine = SentenceTransformerEngine(EMBEDDING_MODEL_NAME, engine=name, threads=args.threads or None,
+                                           batch_size=args.batch_size)
+        load_seconds = time.perf_counter() - t0
+        engine.embed_documents(corpus[:8])  # warm-up
+
+        t0 = time.perf_counter()
+        docs = np.asarray(engine.embed_documents(corpus), dtype=np.float32)
+        elapsed = time.perf_counter() - t0
+        qs = np.asarray(engine.embed_documents(queries), dtype=np.float32)
+        hits = topk(docs, qs, args.k)
+
+        row = {
+            "load_seconds": round(load_seconds, 3),
+            "texts_per_sec": round(len(corpus) / elapsed, 1),
+        }
+        if baseline is None:
+            baseline = (docs, hits)
+        else:
+            base_docs, base_hits = baseline
+            cos = np.sum(docs * base_docs, axis=1) / (
+                np.linalg.norm(docs, axis=1) * np.linalg.norm(base_docs, axis=1))
+            row["topk_agreement"] = round(float(np.mean(
+                [len(set(a) & set(b)) / args.k for a, b in zip(hits, base_hits)])), 4)
+            row["mean_cosine_vs_torch"] = round(float(np.mean(cos)), 5)
+            row["speedup_vs_torch"] = round(row["texts_per_sec"] / results["engines"]["torch"]["texts_per_sec"], 2)
+        results["engines"][name] = row
+        print(f"{name}: {row}")
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Concurrent query-embedding throughput with and without the micro-batcher.
+
+    python benchmarks/bench_query_batching.py --threads 16 --queries 50
+    python benchmarks/bench_query_batching.py --real --threads 16   # the configured sentence-transformers model
+
+By default a fake model with a fixed per-call cost that serializes calls
+(like a CPU model already using every core) stands in for the real one.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import repo_path  # noqa: E402,F401
+from backend.embedding_batcher import EmbeddingBatcher  # noqa: E402
+from corpora import QUESTIONS  # noqa: E402
+from fakes import FakeEmbeddings  # noqa: E402
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _drive(embed_query, threads: int, queries: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(t):
+        mine = []
+        for i in range(queries):
+            started = time.perf_counter()
+            embed_query(f"{QUESTIONS[(t * queries + i) % len(QUESTIONS)]} #{t}-{i}")
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=client, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    wall = time.perf_counter() - started
+    ms = [s * 1000 for s in latencies]
+    return {
+        "queries_per_sec": round(len(ms) / wall, 1),
+        "p50_ms": round(_pct(ms, 50), 3),
+        "p95_ms": round(_pct(ms, 95), 3),
+        "p99_ms": round(_pct(ms, 99), 3),
+        "mean_ms": round(statistics.mean(ms), 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--queries", type=int, default=50, help="queries per thread")
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--wait-ms", type=float, default=2.0)
+    ap.add_argument("--call-ms", type=float, default=8.0, help="fake model: fixed cost per call")
+    ap.add_argument("--text-ms", type=float, default=0.5, help="fake model: cost per text")
+    ap.add_argument("--real", action="store_true", help="use the configured embedding model")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    if args.real:
+        from backend.models import get_embedding_model
+        model = get_embedding_model()
+        model.embed_documents(["warm up"])
+    else:
+        model = FakeEmbeddings(seconds_per_call=args.call_ms / 1000, seconds_per_text=args.text_ms / 1000,
+                               exclusive=True)
+
+    results = {"direct": _drive(model.embed_query, args.threads, args.queries)}
+    batcher = EmbeddingBatcher(model.embed_documents, max_batch_size=args.batch_size, max_wait_ms=args.wait_ms)
+    results["batched"] = _drive(batcher.embed, args.threads, args.queries)
+    results["batched"].update(batcher.stats())
+    results["speedup"] = round(results["batched"]["queries_per_sec"] / results["direct"]["queries_per_sec"], 2)
+
+    report = {"params": vars(args), "results": results}
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
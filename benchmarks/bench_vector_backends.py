@@ -0,0 +1,118 @@
+"""
+Compare open and query latency of a Chroma collection against the
+memory-mapped numpy index exported from it. Open times go through the app's
+load path (`load_vectorstore_if_exists` / `load_numpy_retriever_if_exists`)
+on a cold client cache, followed by one query.
+
+    python benchmarks/bench_vector_backends.py --n 20000 --dim 768 --dtype float16
+
+Uses random unit vectors and the fake embedding model, so no model download
+or API key is needed.
+"""
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+import chromadb  # noqa: F401
+from chromadb.api.client import SharedSystemClient
+
+import repo_path  # noqa: F401
+from fakes import FakeEmbeddings
+from backend import models
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _summary(seconds):
+    ms = [s * 1000 for s in seconds]
+    return {"p50_ms": round(_pct(ms, 50), 3), "p95_ms": round(_pct(ms, 95), 3), "mean_ms": round(statistics.mean(ms), 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=10000, help="number of chunks")
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--dtype", default="float16", choices=["float16", "float32", "int8"])
+    ap.add_argument("--out", help="write results as JSON to this path")
+    args = ap.parse_args()
+
+    models.set_models(embedding_model=FakeEmbeddings(dim=args.dim))
+    from backend import RAG_end
+    RAG_end.NUMPY_INDEX_DTYPE = args.dtype
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.n, args.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.integers(0, args.n, args.queries)] + 0.05 * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    workdir = tempfile.mkdtemp(prefix="bench_vectors_")
+    try:
+        client = chromadb.PersistentClient(path=workdir)
+        col = client.get_or_create_collection("default_collection")
+        for start in range(0, args.n, 1000):
+            end = min(start + 1000, args.n)
+            col.add(ids=[f"c{i}" for i in range(start, end)],
+                    documents=[f"chunk {i}" for i in range(start, end)],
+                    embeddings=vectors[start:end].tolist())
+
+        RAG_end._write_version(workdir, [f"c{i}" for i in range(args.n)])
+        t0 = time.perf_counter()
+        RAG_end._sync_numpy_index(col, workdir)
+        build_seconds = time.perf_counter() - t0
+        del col, client
+
+        SharedSystemClient.clear_system_cache()
+        t0 = time.perf_counter()
+        col = RAG_end.load_vectorstore_if_exists(workdir)._collection
+        col.query(query_embeddings=[queries[0].tolist()], n_results=args.k)
+        chroma_open = time.perf_counter() - t0
+
+        SharedSystemClient.clear_system_cache()
+        t0 = time.perf_counter()
+        index = RAG_end.load_numpy_retriever_if_exists(workdir).index
+        index.search(queries[0], args.k)
+        numpy_open = time.perf_counter() - t0
+
+        chroma_times, numpy_times, overlap = [], [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            res = col.query(query_embeddings=[q.tolist()], n_results=args.k, include=["documents"])
+            chroma_times.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            hits = index.search(q, args.k)
+            [index.text(row) for row, _ in hits]
+            numpy_times.append(time.perf_counter() - t0)
+
+            overlap.append(len(set(res["ids"][0]) & {index.ids[row] for row, _ in hits}) / args.k)
+
+        results = {
+            "n": args.n,
+            "dim": args.dim,
+            "k": args.k,
+            "numpy_dtype": args.dtype,
+            "numpy_build_seconds": round(build_seconds, 3),
+            "open_ms": {"chroma": round(chroma_open * 1000, 3), "numpy": round(numpy_open * 1000, 3)},
+            "query": {"chroma": _summary(chroma_times), "numpy": _summary(numpy_times)},
+            "topk_agreement": round(statistics.mean(overlap), 4),
+        }
+        print(json.dumps(results, indent=2))
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Diff two run_suite.py result files and flag regressions.
+
+    python benchmarks/compare_results.py base.json head.json --threshold 10
+
+Exits with status 1 when any tracked metric got worse by more than
+`--threshold` percent, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+# metric name -> True if higher is better
+TRACKED = {
+    "chunks_per_sec": True,
+    "rows_per_sec": True,
+    "mb_per_sec": True,
+    "requests_per_sec": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_python_mb": False,
+    "peak_rss_mb": False,
+}
+
+
+def _flatten(node, prefix=""):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, node
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("base")
+    ap.add_argument("head")
+    ap.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = ap.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    base_metrics = dict(_flatten({"peak_rss_mb": base.get("peak_rss_mb"), **base["results"]}))
+    head_metrics = dict(_flatten({"peak_rss_mb": head.get("peak_rss_mb"), **head["results"]}))
+
+    print(f"base {str(base.get('commit'))[:10]}  head {str(head.get('commit'))[:10]}")
+    regressions = 0
+    for name in sorted(base_metrics.keys() & head_metrics.keys()):
+        leaf = name.rsplit(".", 1)[-1]
+        if leaf not in TRACKED:
+            continue
+        old, new = base_metrics[name], head_metrics[name]
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if TRACKED[leaf] else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  ❌ regression"
+            regressions += 1
+        elif worse < -args.threshold:
+            flag = "  ✅ improved"
+        print(f"{name:45s} {old:>12.3f} -> {new:>12.3f}  {change:+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{regressions} metric(s) regressed by more than {args.threshold:g}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
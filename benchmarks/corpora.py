@@ -0,0 +1,52 @@
+"""Generated PDF/TXT/CSV inputs of configurable size for the benchmarks."""
+import csv
+import random
+
+TOPICS = ["refunds", "shipping", "security", "onboarding", "billing", "privacy", "warranty", "support"]
+WORDS = ("policy customer account request days within business team review approve invoice order "
+         "payment notice period access data record retention update contract service level report").split()
+
+
+def _paragraph(rng: random.Random, sentences: int = 6) -> str:
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+        words.insert(rng.randint(0, len(words)), rng.choice(TOPICS))
+        out.append(" ".join(words).capitalize() + ".")
+    return " ".join(out)
+
+
+def make_txt(path: str, paragraphs: int = 500, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(paragraphs):
+            f.write(f"Section {i}: {rng.choice(TOPICS)}\n{_paragraph(rng)}\n\n")
+    return path
+
+
+def make_pdf(path: str, pages: int = 50, seed: int = 0) -> str:
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        text = f"Page {i} - {rng.choice(TOPICS)}\n\n" + "\n\n".join(_paragraph(rng) for _ in range(4))
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_csv(path: str, rows: int = 100000, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["order_id", "region", "category", "amount", "quantity", "customer_id"])
+        for i in range(rows):
+            w.writerow([i, rng.choice("NSEW"), rng.choice(TOPICS), round(rng.random() * 500, 2),
+                        rng.randint(1, 20), rng.randint(1, rows // 10 + 1)])
+    return path
+
+
+QUESTIONS = [f"What does the document say about {t} and {w}?" for t in TOPICS for w in WORDS]
@@ -0,0 +1,98 @@
+"""
+Deterministic local stand-ins for the Gemini chat model and the mpnet
+embeddings, so benchmarks (and anything else) can run offline.
+Install them with `backend.models.set_models(FakeEmbeddings(), FakeChatModel())`.
+"""
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_WORD = re.compile(r"\w+")
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words vectors: deterministic, similar texts get similar vectors.
+    `seconds_per_call` + `seconds_per_text` simulate model cost; with `exclusive`
+    calls run one at a time, like a CPU model that already uses every core.
+    """
+
+    def __init__(self, dim: int = 384, seconds_per_text: float = 0.0, seconds_per_call: float = 0.0,
+                 exclusive: bool = False):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+        self.seconds_per_call = seconds_per_call
+        self._lock = threading.Lock() if exclusive else None
+
+    def _embed(self, text: str):
+        v = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            h = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:8], "little")
+            v[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        n = np.linalg.norm(v)
+        return (v / n if n else v).tolist()
+
+    def embed_documents(self, texts):
+        cost = self.seconds_per_call + self.seconds_per_text * len(texts)
+        if cost and self._lock is not None:
+            with self._lock:
+                time.sleep(cost)
+        elif cost:
+            time.sleep(cost)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers the repo's prompts deterministically: SQL prompts get a COUNT(*)
+    over the first table in the schema, condense-question prompts echo the
+    follow-up question, and RAG prompts get a short answer quoting the context.
+    `latency` simulates time-to-first-token, `seconds_per_token` streaming speed.
+    """
+
+    latency: float = 0.0
+    seconds_per_token: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-deterministic"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        text = messages[-1].content if messages else ""
+        table = re.search(r"Table: (.+)", text)
+        if "SQL" in text and table:
+            return f'SELECT COUNT(*) FROM "{table.group(1).strip()}"'
+        follow_up = re.search(r"Follow Up Input: (.*)\n", text)
+        if follow_up:
+            return follow_up.group(1).strip()
+        context = re.search(r"Context:\s*(.*?)\s*Question:", text, re.S)
+        snippet = " ".join((context.group(1) if context else text).split()[:30])
+        return f"According to the document: {snippet}"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        content = self._respond(messages)
+        time.sleep(self.latency + self.seconds_per_token * len(content.split()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for i, word in enumerate(self._respond(messages).split()):
+            time.sleep(self.seconds_per_token)
+            token = word if i == 0 else " " + word
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
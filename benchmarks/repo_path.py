@@ -0,0 +1,20 @@
+"""
+Import setup shared by the benchmark scripts and tests/: puts the repo root on
+sys.path and makes `backend` importable.
+
+    import repo_path  # noqa: F401  (before any `backend.*` import)
+"""
+import os
+import sys
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# The app imports the Backend/ directory as `backend`, which only resolves on
+# case-insensitive filesystems; map the name explicitly everywhere else.
+if "backend" not in sys.modules and not os.path.isdir(os.path.join(REPO_ROOT, "backend")):
+    package = types.ModuleType("backend")
+    package.__path__ = [os.path.join(REPO_ROOT, "Backend")]
+    sys.modules["backend"] = package
@@ -0,0 +1,233 @@
+"""
+Offline end-to-end benchmark of the API: generates a PDF, a TXT and a CSV
+corpus, uploads them through /upload, then drives /ask (and /ask/stream for
+documents) with concurrent clients. The embedding model and the LLM are the
+deterministic fakes in benchmarks/fakes.py, so no network or API key is needed
+and runs on the same machine are comparable commit to commit.
+
+    python benchmarks/run_suite.py --pdf-pages 50 --txt-paragraphs 2000 --csv-rows 200000 \
+        --requests 200 --concurrency 8 --out benchmarks/results/$(git rev-parse --short HEAD).json
+
+Compare two result files with benchmarks/compare_results.py.
+Answer/SQL/embedding caches are disabled unless --with-caches is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+
+import corpora  # noqa: E402
+from repo_path import REPO_ROOT  # noqa: E402
+from fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _latency_summary(seconds):
+    if not seconds:
+        return {}
+    ms = [s * 1000 for s in seconds]
+    return {
+        "p50_ms": round(_pct(ms, 50), 3),
+        "p95_ms": round(_pct(ms, 95), 3),
+        "p99_ms": round(_pct(ms, 99), 3),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+class _Phase:
+    """Wall time and Python heap peak (tracemalloc) for one phase."""
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+        self.peak_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+
+
+async def _upload(client, path, file_type, poll_interval=0.05):
+    with open(path, "rb") as f:
+        resp = await client.post("/upload", files={"file": (os.path.basename(path), f)},
+                                 data={"file_type": file_type, "replace": "true"})
+    resp.raise_for_status()
+    job_id = resp.json()["job_id"]
+    while True:
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["stage"] in ("done", "failed", "cancelled"):
+            return job
+        await asyncio.sleep(poll_interval)
+
+
+async def _load(client, saved_name, questions, concurrency, stream=False):
+    """Fire len(questions) requests with at most `concurrency` in flight."""
+    sem = asyncio.Semaphore(concurrency)
+    latencies, first_token, errors = [], [], 0
+
+    async def one(question):
+        nonlocal errors
+        async with sem:
+            started = time.perf_counter()
+            data = {"saved_name": saved_name, "question": question}
+            if not stream:
+                resp = await client.post("/ask", data=data)
+                ok = resp.status_code == 200
+            else:
+                ok = True
+                async with client.stream("POST", "/ask/stream", data=data) as resp:
+                    got_first = False
+                    async for line in resp.aiter_lines():
+                        if not got_first and line.startswith("event: token"):
+                            first_token.append(time.perf_counter() - started)
+                            got_first = True
+                        if line.startswith("event: error"):
+                            ok = False
+                    ok = ok and resp.status_code == 200
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    wall = time.perf_counter() - started
+    out = {"requests": len(questions), "concurrency": concurrency, "errors": errors,
+           "requests_per_sec": round(len(questions) / wall, 2), **_latency_summary(latencies)}
+    if stream:
+        out["first_token"] = _latency_summary(first_token)
+    return out
+
+
+async def run(args, workdir):
+    from backend import models
+    from API_Backend.API_main import app
+
+    models.set_models(
+        embedding_model=FakeEmbeddings(dim=args.dim, seconds_per_text=args.embed_ms / 1000),
+        llm=FakeChatModel(latency=args.llm_latency_ms / 1000, seconds_per_token=args.token_ms / 1000),
+    )
+
+    corpus = os.path.join(workdir, "corpus")
+    os.makedirs(corpus)
+    files = []
+    if args.pdf_pages:
+        files.append((corpora.make_pdf(os.path.join(corpus, "bench.pdf"), args.pdf_pages, args.seed), "pdf"))
+    if args.txt_paragraphs:
+        files.append((corpora.make_txt(os.path.join(corpus, "bench.txt"), args.txt_paragraphs, args.seed), "txt"))
+    if args.csv_rows:
+        files.append((corpora.make_csv(os.path.join(corpus, "bench.csv"), args.csv_rows, args.seed), "csv"))
+
+    results = {"ingest": {}, "ask": {}, "ask_stream": {}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for path, file_type in files:
+            with _Phase() as phase:
+                job = await _upload(client, path, file_type)
+            if job["stage"] != "done":
+                raise RuntimeError(f"Ingesting {path} failed: {job.get('error')}")
+            stats = job["result"]["ingest"]
+            results["ingest"][file_type] = {
+                "bytes": os.path.getsize(path),
+                "wall_seconds": round(phase.seconds, 3),
+                "mb_per_sec": round(os.path.getsize(path) / 2**20 / phase.seconds, 3),
+                "peak_python_mb": phase.peak_mb,
+                **stats,
+            }
+
+        for path, file_type in files:
+            saved_name = os.path.basename(path)
+            questions = [f"{corpora.QUESTIONS[i % len(corpora.QUESTIONS)]} ({i})" for i in range(args.requests)]
+            # One untimed request opens the collection and loads the chain.
+            await client.post("/ask", data={"saved_name": saved_name, "question": "warm up"})
+            with _Phase() as phase:
+                results["ask"][file_type] = await _load(client, saved_name, questions, args.concurrency)
+            results["ask"][file_type]["peak_python_mb"] = phase.peak_mb
+            if file_type != "csv":
+                with _Phase() as phase:
+                    results["ask_stream"][file_type] = await _load(client, saved_name, questions,
+                                                                   args.concurrency, stream=True)
+                results["ask_stream"][file_type]["peak_python_mb"] = phase.peak_mb
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf-pages", type=int, default=30)
+    ap.add_argument("--txt-paragraphs", type=int, default=1000)
+    ap.add_argument("--csv-rows", type=int, default=100000)
+    ap.add_argument("--requests", type=int, default=100, help="questions per collection")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--dim", type=int, default=384, help="fake embedding dimension")
+    ap.add_argument("--embed-ms", type=float, default=0.0, help="simulated embedding cost per text")
+    ap.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated LLM time to first token")
+    ap.add_argument("--token-ms", type=float, default=0.0, help="simulated LLM time per output token")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--with-caches", action="store_true", help="keep answer/SQL/embedding caches enabled")
+    ap.add_argument("--keep", action="store_true", help="keep the temporary data directory")
+    ap.add_argument("--out", default=None, help="write JSON results here")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rag_bench_")
+    # The backend resolves data/ relative to the working directory at import time.
+    os.chdir(workdir)
+    os.environ["MODEL_WARMUP"] = "0"
+    if not args.with_caches:
+        os.environ["ANSWER_CACHE_SIZE"] = "0"
+        os.environ["SQL_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["EMBED_CACHE_MAX_MB"] = "0"
+
+    tracemalloc.start()
+    try:
+        results = asyncio.run(run(args, workdir))
+    finally:
+        tracemalloc.stop()
+        os.chdir(REPO_ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": vars(args),
+        # ru_maxrss is KiB on Linux, bytes on macOS.
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (2**20 if sys.platform == "darwin" else 2**10), 1),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import repo_path  # noqa: E402,F401
+
+# Backend modules create data/ directories relative to the working directory on import.
+os.chdir(tempfile.mkdtemp(prefix="file-rag-tests-"))
+
+
+@pytest.fixture(scope="session")
+def api():
+    """TestClient for the FastAPI app, with the offline fakes from benchmarks/fakes.py as models."""
+    pytest.importorskip("langchain")
+    pytest.importorskip("langchain_community")
+    pytest.importorskip("chromadb")
+    from fastapi.testclient import TestClient
+
+    from fakes import FakeChatModel, FakeEmbeddings
+    from backend import models
+
+    models.set_models(embedding_model=FakeEmbeddings(), llm=FakeChatModel())
+    from API_Backend.API_main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def upload(api):
+    """upload(filename, content, file_type) -> saved_name, once its ingestion job is done."""
+    def run(filename: str, content: bytes, file_type: str = None):
+        file_type = file_type or filename.rsplit(".", 1)[-1]
+        resp = api.post("/upload", files={"file": (filename, content)}, data={"file_type": file_type})
+        assert resp.status_code == 202, resp.text
+        job_id = resp.json()["job_id"]
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            job = api.get(f"/jobs/{job_id}").json()
+            if job["stage"] in ("done", "failed", "cancelled"):
+                break
+            time.sleep(0.02)
+        assert job["stage"] == "done", job
+        return resp.json()["saved_name"]
+    return run
+
+
+@pytest.fixture
+def ask_stream(api):
+    """ask_stream(saved_name, question) -> [(event, data), ...] from /ask/stream."""
+    def run(saved_name: str, question: str):
+        resp = api.post("/ask/stream", data={"saved_name": saved_name, "question": question})
+        assert resp.status_code == 200, resp.text
+        events = []
+        for block in resp.text.split("\n\n"):
+            if block.strip():
+                fields = dict(line.split(": ", 1) for line in block.splitlines())
+                events.append((fields["event"], json.loads(fields["data"])))
+        return events
+    return run
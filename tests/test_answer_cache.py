@@ -0,0 +1,58 @@
+import re
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from fakes import FakeChatModel  # noqa: E402
+from backend import models  # noqa: E402
+
+
+class HistoryAwareChatModel(FakeChatModel):
+    """Condenses a follow-up with the last user question; answers by restating the question."""
+
+    def _respond(self, messages):
+        text = messages[-1].content
+        follow_up = re.search(r"Follow Up Input: (.*)\n", text)
+        if follow_up:
+            asked = re.findall(r"Human: (.*)", text)
+            return f"{follow_up.group(1).strip()} ({asked[-1] if asked else ''})"
+        question = re.search(r"Question:\s*(.*?)\s*Answer:", text, re.S)
+        return f"Answer to: {question.group(1) if question else text}"
+
+
+@pytest.fixture
+def fruit(api, upload, monkeypatch):
+    monkeypatch.setattr(models, "_llm", HistoryAwareChatModel())
+    return upload("fruit.txt", b"Apples are red and crisp.\n\nBananas are yellow and soft.\n")
+
+
+def test_follow_up_depends_on_the_conversation(api, fruit):
+    def ask(question):
+        resp = api.post("/ask", data={"saved_name": fruit, "question": question})
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+
+    assert ask("Tell me about apples")["answer_cache"] == "miss"
+    apples = ask("What about the second one?")
+    api.post("/clear_chat", data={"saved_name": fruit})
+    ask("Tell me about bananas")
+    bananas = ask("What about the second one?")
+
+    assert (apples["answer_cache"], bananas["answer_cache"]) == ("skip", "skip")
+    assert "apples" in apples["answer"] and "bananas" in bananas["answer"]
+
+    api.post("/clear_chat", data={"saved_name": fruit})
+    standalone = ask("What about the second one?")
+    assert standalone["answer_cache"] == "miss"
+    assert standalone["answer"] == "Answer to: What about the second one?"
+    api.post("/clear_chat", data={"saved_name": fruit})
+    assert ask("What about the second one?")["answer_cache"] == "hit"
+
+
+def test_streamed_follow_up_skips_the_cache(api, fruit, ask_stream):
+    ask_stream(fruit, "Tell me about bananas")
+    events = ask_stream(fruit, "Tell me about apples")
+    done = events[-1][1]
+    assert events[-1][0] == "done" and done["answer_cache"] == "skip"
+    assert done["answer"] == "Answer to: Tell me about apples (Tell me about bananas)"
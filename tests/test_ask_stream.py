@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("langchain")
+
+from fakes import FakeChatModel  # noqa: E402
+from backend import models  # noqa: E402
+
+
+class FailingChatModel(FakeChatModel):
+    """Streams two tokens, then fails like a dropped LLM connection."""
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        yield next(chunks)
+        yield next(chunks)
+        raise RuntimeError("LLM connection lost")
+
+
+@pytest.fixture
+def doc(upload):
+    return upload("stream.txt", b"The warehouse ships orders every weekday before noon.\n")
+
+
+def test_rag_stream_sends_tokens_then_done(doc, ask_stream):
+    events = ask_stream(doc, "When does the warehouse ship?")
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "done" and set(kinds[:-1]) == {"token"} and len(kinds) > 2
+
+    done = events[-1][1]
+    assert "".join(data["text"] for _, data in events[:-1]) == done["answer"]
+    assert done["answer"].startswith("According to the document: The warehouse ships")
+    assert (done["mode"], done["answer_cache"]) == ("rag", "miss")
+
+
+def test_rag_stream_failure_ends_with_error_event(api, doc, ask_stream, monkeypatch):
+    monkeypatch.setattr(models, "_llm", FailingChatModel())
+    events = ask_stream(doc, "When does the warehouse ship?")
+    assert [kind for kind, _ in events] == ["token", "token", "error"]
+    assert events[-1][1] == {"error": "LLM connection lost"}
+    # Nothing is saved for an answer that never completed.
+    assert api.get(f"/chat/{doc}").json()["chat"] == []
+
+
+def test_csv_stream_sends_sql_rows_then_done(upload, ask_stream):
+    table = upload("orders.csv", b"id,region\n1,north\n2,south\n3,north\n")
+    events = ask_stream(table, "How many orders are there?")
+    assert [kind for kind, _ in events] == ["sql", "row", "done"]
+    assert events[0][1]["sql"] == 'SELECT COUNT(*) FROM "orders"'
+    assert list(events[1][1].values()) == [3]
+    assert events[2][1]["assistant"] == "The answer is **3**."
+
+
+def test_unknown_collection_is_a_404_not_a_stream(api):
+    resp = api.post("/ask/stream", data={"saved_name": "missing.pdf", "question": "Anything?"})
+    assert resp.status_code == 404
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from backend import utiils  # noqa: E402
+
+
+def test_pages_walk_back_with_next_before():
+    utiils.append_many_to_chat("pages.pdf", [("user", f"q{i}") if i % 2 == 0 else ("assistant", f"a{i}")
+                                             for i in range(5)])
+    page, before = utiils.load_chat_page("pages.pdf", limit=2)
+    assert [m["text"] for m in page] == ["a3", "q4"]
+    page, before = utiils.load_chat_page("pages.pdf", limit=2, before=before)
+    assert [m["text"] for m in page] == ["a1", "q2"] and before is not None
+    page, before = utiils.load_chat_page("pages.pdf", limit=2, before=before)
+    assert [m["text"] for m in page] == ["q0"] and before is None
+
+    with pytest.raises(ValueError):
+        utiils.load_chat_page("pages.pdf", limit=0)
+
+
+def test_since_returns_only_newer_messages():
+    utiils.append_to_chat("since.pdf", "user", "first")
+    _, _, count, last_id = utiils.chat_signature("since.pdf")
+    utiils.append_to_chat("since.pdf", "assistant", "second")
+    utiils.append_to_chat("since.pdf", "user", "third")
+    assert count == 1
+    assert [m["text"] for m in utiils.load_chat_since("since.pdf", last_id)] == ["second", "third"]
+    assert [m["text"] for m in utiils.load_chat_since("since.pdf", last_id, limit=1)] == ["second"]
+
+
+def test_legacy_markdown_chat_is_imported_once():
+    path = utiils.chat_file_for("legacy.pdf")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("**User:** hello\n\n**Assistant:** hi there\n")
+    assert utiils.load_chat_history("legacy.pdf") == [("user", "hello"), ("assistant", "hi there")]
+    assert not os.path.exists(path)
+    utiils.save_chat_history("legacy.pdf", [])
+    assert utiils.load_chat_history("legacy.pdf") == []
+
+
+@pytest.mark.parametrize("query", ["limit=0", f"limit={10 ** 6}", "before=-1", "since=-5"])
+def test_invalid_paging_parameters_are_rejected(api, query):
+    assert api.get(f"/chat/pages.pdf?{query}").status_code == 422
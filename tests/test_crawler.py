@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from backend.crawler import CrawlState, crawl_sync  # noqa: E402
+
+SITE = {
+    "/": '<html><title>Home</title><body><p>Welcome</p><a href="/a">A</a> <a href="/b">B</a></body></html>',
+    "/a": "<html><title>A</title><body><p>Page A</p></body></html>",
+    "/b": "<html><title>B</title><body><p>Page B</p></body></html>",
+}
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = SITE.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    saved = dict(SITE)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+    SITE.clear()
+    SITE.update(saved)
+
+
+def test_recrawl_is_conditional(site, tmp_path):
+    cache = str(tmp_path / "cache")
+    pages, stats = crawl_sync(site, cache, max_depth=1)
+    assert [p["title"] for p in pages] == ["Home", "A", "B"]
+    assert stats["new"] == 3
+
+    SITE["/a"] = "<html><title>A</title><body><p>Page A, revised</p></body></html>"
+    del SITE["/b"]
+    pages, stats = crawl_sync(site, cache, max_depth=1)
+    assert (stats["unchanged"], stats["changed"], stats["error"]) == (1, 1, 1)
+    assert {p["url"]: p["text"] for p in pages} == {site: "Welcome\nA B", site + "a": "Page A, revised"}
+    assert set(CrawlState(cache).pages) == {site, site + "a"}
+
+
+def test_missing_cached_text_is_refetched(site, tmp_path):
+    cache = str(tmp_path / "cache")
+    crawl_sync(site, cache)
+    os.remove(CrawlState(cache)._text_path(site))
+
+    pages, stats = crawl_sync(site, cache)
+    assert stats["error"] == 0 and stats["unchanged"] == 0
+    assert pages[0]["text"] == "Welcome\nA B"
+    assert CrawlState(cache).has_text(site)
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("chromadb")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from fakes import FakeEmbeddings  # noqa: E402
+from backend import models  # noqa: E402
+
+models.set_models(embedding_model=FakeEmbeddings())
+
+from backend import RAG_end  # noqa: E402
+
+
+def test_prefetch_stays_bounded_and_reraises():
+    produced = []
+
+    def items():
+        for i in range(20):
+            produced.append(i)
+            yield i
+        raise RuntimeError("loader failed")
+
+    stream = RAG_end._prefetch(items(), max_ahead=2)
+    consumed = []
+    with pytest.raises(RuntimeError, match="loader failed"):
+        for item in stream:
+            consumed.append(item)
+            time.sleep(0.02)
+            # Two items queued plus one waiting in put() at most.
+            assert len(produced) <= len(consumed) + 3
+    assert consumed == list(range(20))
+
+
+def test_abandoned_prefetch_stops_its_producer():
+    stopped = threading.Event()
+
+    def items():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            stopped.set()
+
+    stream = RAG_end._prefetch(items(), max_ahead=1)
+    assert next(stream) == 0
+    stream.close()
+    assert stopped.wait(5)
+
+
+def test_index_documents_reads_pages_lazily(tmp_path, monkeypatch):
+    monkeypatch.setattr(RAG_end, "INGEST_PREFETCH_BATCHES", 1)
+    pulled = []
+    ahead = []
+
+    def pages():
+        for i in range(30):
+            pulled.append(i)
+            yield Document(page_content=f"Page {i} of a long document.")
+
+    embed = RAG_end.embed_texts
+    embedded = []
+
+    def slow_embed(texts, **kwargs):
+        time.sleep(0.02)
+        ahead.append(len(pulled) - sum(len(t) for t in embedded) - len(texts))
+        embedded.append(texts)
+        return embed(texts, **kwargs)
+
+    monkeypatch.setattr(RAG_end, "embed_texts", slow_embed)
+    _, stats = RAG_end.index_documents(pages(), str(tmp_path / "store"), write_batch_size=3)
+
+    assert (stats["pages"], stats["chunks"], stats["added"]) == (30, 30, 30)
+    # At most one batch queued, one waiting to be queued and one being split.
+    assert max(ahead) <= 3 * 3
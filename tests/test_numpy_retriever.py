@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("chromadb")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from fakes import FakeEmbeddings  # noqa: E402
+from backend import models  # noqa: E402
+
+models.set_models(embedding_model=FakeEmbeddings())
+
+from backend import RAG_end  # noqa: E402
+
+
+def test_fresh_export_opens_without_chroma(tmp_path, monkeypatch):
+    persist = str(tmp_path / "store")
+    vectordb, _ = RAG_end.index_documents([Document(page_content="Apples are red."),
+                                           Document(page_content="Bananas are yellow.")], persist)
+    RAG_end._sync_numpy_index(vectordb._collection, persist)
+
+    def no_chroma(*args, **kwargs):
+        raise AssertionError("Chroma opened although the numpy export is current")
+
+    monkeypatch.setattr(RAG_end, "load_vectorstore_if_exists", no_chroma)
+    retriever = RAG_end.load_numpy_retriever_if_exists(persist)
+    assert [d.page_content for d in retriever.invoke("red apples")][0] == "Apples are red."
+
+    monkeypatch.undo()
+    RAG_end._write_version(persist, ["a new chunk id"])  # the export is now stale
+    assert RAG_end.load_numpy_retriever_if_exists(persist) is not None
+    assert RAG_end.numpy_index.index_version(persist) == RAG_end.collection_version(persist)
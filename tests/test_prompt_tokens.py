@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_community")
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langchain_core.retrievers import BaseRetriever  # noqa: E402
+
+from fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+from backend import models  # noqa: E402
+
+models.set_models(embedding_model=FakeEmbeddings(), llm=FakeChatModel())
+
+from backend import RAG_end  # noqa: E402
+from backend.context_builder import prompt_tokens  # noqa: E402
+
+HISTORY = [HumanMessage(content="What is the report about?"), AIMessage(content="Quarterly sales.")]
+
+
+class StaticRetriever(BaseRetriever):
+    def _get_relevant_documents(self, query, *, run_manager):
+        return [Document(page_content="Sales grew 12% in the third quarter, led by the northern region.")]
+
+
+def prompts_logged(kind: str) -> int:
+    series = prompt_tokens._series.get((kind,))
+    return sum(series[0]) if series else 0
+
+
+def test_chain_logs_condense_and_answer_prompts():
+    chain = RAG_end.get_conversational_chain(retriever=StaticRetriever())
+    before = prompts_logged("chain")
+    answer = RAG_end.answer_question(chain, "And in the fourth?", HISTORY)
+    assert answer
+    assert prompts_logged("chain") - before == 2
+
+
+def test_stream_answer_logs_condense_and_answer_prompts():
+    chain = RAG_end.get_conversational_chain(retriever=StaticRetriever())
+    before_chain, before_answer = prompts_logged("chain"), prompts_logged("answer")
+    tokens = list(RAG_end.stream_answer(chain, "And in the fourth?", HISTORY))
+    assert tokens
+    assert prompts_logged("chain") - before_chain == 1
+    assert prompts_logged("answer") - before_answer == 1
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("chromadb")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from fakes import FakeEmbeddings  # noqa: E402
+from backend import models  # noqa: E402
+
+models.set_models(embedding_model=FakeEmbeddings())
+
+from backend import RAG_end  # noqa: E402
+
+
+def pages(*texts):
+    return [Document(page_content=t) for t in texts]
+
+
+def counts(stats):
+    return stats["added"], stats["removed"], stats["unchanged"]
+
+
+def test_chunk_ids_come_from_content():
+    ids = RAG_end.chunk_ids_for(pages("same text", "other text", "same text"), "c")
+    assert ids[0].startswith("c_") and ids[2] == ids[0] + "_1"
+    assert len(set(ids)) == 3
+    assert RAG_end.chunk_ids_for(pages("other text"), "c") == [ids[1]]
+
+
+def test_reindex_only_touches_changed_chunks(tmp_path):
+    persist = str(tmp_path / "store")
+    _, stats = RAG_end.index_documents(pages("Alpha page.", "Beta page.", "Gamma page."), persist)
+    assert counts(stats) == (3, 0, 0)
+    version = RAG_end.collection_version(persist)
+
+    _, stats = RAG_end.index_documents(pages("Alpha page.", "Beta page.", "Gamma page."), persist)
+    assert counts(stats) == (0, 0, 3)
+    assert RAG_end.collection_version(persist) == version
+
+    vectordb, stats = RAG_end.index_documents(pages("Alpha page.", "Beta page, revised.", "Gamma page."), persist)
+    assert counts(stats) == (1, 1, 2)
+    assert RAG_end.collection_version(persist) != version
+    assert sorted(vectordb._collection.get()["documents"]) == ["Alpha page.", "Beta page, revised.", "Gamma page."]
@@ -0,0 +1,27 @@
+from backend.sql_cache import SQLCache
+
+SCHEMA = "CREATE TABLE sales (region TEXT, amount REAL)"
+WORDS = ["total", "sales", "region", "amount", "average", "count"]
+
+
+def test_embedding_runs_outside_the_lock(tmp_path):
+    calls = []
+
+    def embed(text):
+        assert not cache._lock.locked()
+        calls.append(text)
+        return [float(w in text) for w in WORDS]
+
+    cache = SQLCache(str(tmp_path / "sql_cache.sqlite"), similarity=0.9, embed_fn=embed)
+    assert cache.get("a.db", SCHEMA, "Total sales by region?") is None
+    assert calls == []  # nothing cached to compare against yet
+
+    cache.put("a.db", SCHEMA, "Total sales by region?", "SELECT region, SUM(amount) FROM sales GROUP BY region")
+    calls.clear()
+    assert cache.get("a.db", SCHEMA, "total sales by region").startswith("SELECT region")
+    assert calls == []  # exact hits are not embedded
+
+    assert cache.get("a.db", SCHEMA, "What are the total sales per region?").startswith("SELECT region")
+    assert cache.get("a.db", SCHEMA, "Average amount?") is None
+    assert len(calls) == 2
+    assert (cache.hits, cache.similar_hits, cache.misses) == (1, 1, 2)